@@ -0,0 +1,125 @@
+"""
+Battery Scout - Article Pool
+Date-partitioned store of each day's collected (and summarized) articles per
+topic, so the Monday weekly digest can be built from the past week without
+extra feed fetches or AI calls.
+
+One JSON file per day: <state dir>/pools/YYYY-MM-DD.json
+"""
+
+import json
+import os
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import storage
+
+# --- CONFIGURATION ---
+POOL_DIR = storage.state_path("pools")
+POOL_RETENTION_DAYS = 14
+
+# Fields persisted per article (everything needed to select and render)
+ARTICLE_FIELDS = (
+    "raw_title", "title", "dedup_title", "link", "published", "source",
+    "snippet", "is_translated", "flag", "lang", "score", "weight", "summary"
+)
+
+
+class ArticlePool:
+    """Reads and writes per-day topic pools."""
+
+    def __init__(self, directory: str = POOL_DIR, retention_days: int = POOL_RETENTION_DAYS):
+        """
+        Args:
+            directory: Directory holding one JSON file per day
+            retention_days: Day files older than this are deleted on save
+        """
+        self.directory = directory
+        self.retention_days = retention_days
+
+    def _path(self, day: date) -> str:
+        return os.path.join(self.directory, f"{day.isoformat()}.json")
+
+    def save(self, day: date, topic_articles: Dict[str, List[List[dict]]]):
+        """
+        Writes a day's pool (replacing an earlier write for the same day).
+
+        Args:
+            day: Collection date
+            topic_articles: Topic -> article groups (one list per search)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        payload = {
+            topic: [[{field: article.get(field) for field in ARTICLE_FIELDS} for article in articles]
+                    for articles in groups]
+            for topic, groups in topic_articles.items()
+        }
+        tmp_path = self._path(day) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(day))
+        self.prune(day)
+
+    def load(self, day: date) -> Optional[Dict[str, List[List[dict]]]]:
+        """
+        Returns: A day's pool, or None if that day was not collected
+        """
+        try:
+            with open(self._path(day), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load_week(self, end: date, topics, days: int = 7) -> Dict[str, List[List[dict]]]:
+        """
+        Merges the last `days` pools (ending on `end`) for the given topics.
+
+        Articles are regrouped by language (English first); within a language
+        summarized stories come first, newest day first.
+
+        Args:
+            end: Last day included (normally today)
+            topics: Topics to load
+            days: Number of days
+
+        Returns:
+            dict: Topic -> article groups (one list per language)
+        """
+        wanted = set(topics)
+        merged: Dict[str, Dict[str, List[dict]]] = {}
+        for offset in range(days):
+            pool = self.load(end - timedelta(days=offset))
+            if not pool:
+                continue
+            for topic, groups in pool.items():
+                if topic not in wanted:
+                    continue
+                by_lang = merged.setdefault(topic, {})
+                for articles in groups:
+                    for article in articles:
+                        by_lang.setdefault(article.get("lang") or "en", []).append(article)
+
+        # Rank within each language: summarized stories first, then newest day
+        # (sorted() is stable, so day order is kept within each tier)
+        return {
+            topic: sorted(
+                (sorted(group, key=lambda article: not article.get("summary")) for group in by_lang.values()),
+                key=lambda group: group[0].get("is_translated", False)
+            )
+            for topic, by_lang in merged.items()
+        }
+
+    def prune(self, today: date) -> int:
+        """
+        Deletes day files older than the retention window.
+
+        Returns:
+            int: Number of files removed
+        """
+        cutoff = (today - timedelta(days=self.retention_days)).isoformat()
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(".json") and name[:-5] < cutoff:
+                os.remove(os.path.join(self.directory, name))
+                removed += 1
+        return removed
@@ -0,0 +1,82 @@
+"""
+Battery Scout - Date Filter Micro-benchmark
+Compares the legacy per-entry dateutil check against date_filter.fresh_entries.
+
+python-dateutil is no longer a project dependency; install it separately to
+include the legacy baseline, otherwise only date_filter is timed.
+
+Usage: python benchmarks/bench_dates.py [entries]
+"""
+
+import calendar
+import os
+import sys
+import time
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import date_filter  # noqa: E402
+
+try:
+    from dateutil import parser as date_parser
+except ImportError:  # Legacy baseline only
+    date_parser = None
+
+ZONES = ["GMT", "+0000", "+0800", "-0500", "+0900"]
+
+
+def make_entries(count, now):
+    """Canned Google News entries spread over the last 48 hours."""
+    entries = []
+    for i in range(count):
+        published_ts = now - (i * 172800 // count)
+        zone = ZONES[i % len(ZONES)]
+        offset = 0 if zone in ("GMT", "+0000") else int(zone[:3]) * 3600
+        local = time.gmtime(published_ts + offset)
+        published = time.strftime("%a, %d %b %Y %H:%M:%S ", local) + zone
+        entry = {"title": f"Article {i}", "published": published}
+        # Like feedparser: every third entry lacks the parsed struct (forces the fallback)
+        if i % 3:
+            entry["published_parsed"] = time.gmtime(published_ts)
+        entries.append(entry)
+    return entries
+
+
+def legacy_filter(entries):
+    fresh = []
+    for entry in entries:
+        pub_date = date_parser.parse(entry["published"]).replace(tzinfo=None)
+        if (datetime.utcnow() - pub_date) < timedelta(hours=24):
+            fresh.append(entry)
+    return fresh
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    now = calendar.timegm(time.gmtime())
+    entries = make_entries(count, now)
+    cutoff = date_filter.run_cutoff(now=now)
+
+    fast_kept = len(date_filter.fresh_entries(entries, cutoff))
+    fast = min(timeit.repeat(lambda: date_filter.fresh_entries(entries, cutoff), number=5, repeat=3)) / 5
+
+    if date_parser is None:
+        print(f"{count} entries over 48h ({fast_kept} kept by date_filter)")
+        print(f"  date_filter.fresh_entries:    {fast * 1000:8.1f} ms")
+        print("  (pip install python-dateutil to compare against the legacy check)")
+        return
+
+    legacy_kept = len(legacy_filter(entries))
+    legacy = min(timeit.repeat(lambda: legacy_filter(entries), number=5, repeat=3)) / 5
+
+    print(f"{count} entries over 48h ({legacy_kept} kept by legacy, {fast_kept} kept by date_filter)")
+    print(f"  legacy dateutil per entry:    {legacy * 1000:8.1f} ms")
+    print(f"  date_filter.fresh_entries:    {fast * 1000:8.1f} ms  ({legacy / fast:.1f}x)")
+    # The legacy path drops the zone, so non-UTC entries near the edge land on the wrong side
+    print(f"  entries misclassified by legacy timezone handling: {abs(legacy_kept - fast_kept)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Battery Scout - Rendering Micro-benchmark
+Compares the legacy `+=` digest assembly against email_template.DigestBuilder.
+
+Usage: python benchmarks/bench_render.py [subscribers] [articles_per_digest]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import email_template  # noqa: E402
+
+TOPICS = ["Next-Gen Batteries", "Advanced Materials", "EU Regulations", "Recycling & Circular Economy"]
+
+
+def make_articles(count):
+    return [
+        {
+            "title": f"CATL unveils sodium-ion battery generation {i} with record density",
+            "link": f"https://news.google.com/rss/articles/CBMi{i:08d}?oc=5",
+            "published": "Mon, 05 Jan 2026 08:30:00 GMT",
+            "source": "Reuters",
+            "summary": "The plant will produce 50 GWh annually using LFP chemistry." if i % 3 else "",
+            "is_translated": i % 2 == 1
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_digest(articles):
+    html = email_template.get_email_header()
+    per_topic = max(1, len(articles) // len(TOPICS))
+    for t, topic in enumerate(TOPICS):
+        html += email_template.get_topic_section_header(topic)
+        for a in articles[t * per_topic:(t + 1) * per_topic]:
+            html += email_template.get_article_card(
+                title=a["title"], link=a["link"], date=a["published"], source=a["source"],
+                summary=a["summary"], is_chinese=a["is_translated"])
+    html += email_template.get_email_footer("https://battery-scout.streamlit.app/?unsubscribe=x")
+    return html
+
+
+def builder_digest(articles):
+    builder = email_template.DigestBuilder()
+    per_topic = max(1, len(articles) // len(TOPICS))
+    for t, topic in enumerate(TOPICS):
+        builder.add_topic(topic)
+        for a in articles[t * per_topic:(t + 1) * per_topic]:
+            builder.add_article(
+                title=a["title"], link=a["link"], date=a["published"], source=a["source"],
+                summary=a["summary"], is_chinese=a["is_translated"])
+    return builder.finish("https://battery-scout.streamlit.app/?unsubscribe=x")
+
+
+def main():
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    per_digest = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    articles = make_articles(per_digest)
+
+    assert legacy_digest(articles) == builder_digest(articles)[0]
+
+    legacy = min(timeit.repeat(lambda: legacy_digest(articles), number=subscribers, repeat=5))
+    builder = min(timeit.repeat(lambda: builder_digest(articles), number=subscribers, repeat=5))
+
+    print(f"{subscribers} digests x {per_digest} articles")
+    print(f"  legacy += (HTML only):        {legacy * 1000:8.1f} ms")
+    print(f"  DigestBuilder (HTML + text):  {builder * 1000:8.1f} ms  ({legacy / builder:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Battery Scout - Date Filter
+Freshness check for feed entries against a single cutoff timestamp per run.
+
+feedparser already parses `published` into a UTC struct_time
+(`published_parsed`); only entries without it fall back to the RFC 822
+parser from the standard library. All comparisons are on UTC epoch
+seconds, so the publisher's timezone is honoured.
+"""
+
+import calendar
+import time
+from email.utils import parsedate_tz
+from typing import Iterable, List, Optional
+
+# --- CONFIGURATION ---
+FRESH_HOURS = 24  # Articles published within this window are "new"
+
+
+def run_cutoff(hours: float = FRESH_HOURS, now: Optional[float] = None) -> float:
+    """
+    Computes the freshness cutoff once for the whole run.
+
+    Args:
+        hours: Window length
+        now: Current epoch time (defaults to time.time())
+
+    Returns:
+        float: Epoch seconds; entries published before this are stale
+    """
+    return (time.time() if now is None else now) - hours * 3600
+
+
+def parse_rfc822(value: str) -> Optional[float]:
+    """
+    Parses an RFC 822 date ("Mon, 05 Jan 2026 08:30:00 GMT").
+
+    A date without a zone is taken as UTC, like feedparser does.
+
+    Args:
+        value: Date string
+
+    Returns:
+        Optional[float]: Epoch seconds, or None if unparseable
+    """
+    parsed = parsedate_tz(value) if value else None
+    if parsed is None:
+        return None
+    try:
+        return float(calendar.timegm(parsed[:9]) - (parsed[9] or 0))
+    except (ValueError, OverflowError):
+        return None
+
+
+def entry_timestamp(entry) -> Optional[float]:
+    """
+    Publication time of a feed entry.
+
+    Args:
+        entry: feedparser entry
+
+    Returns:
+        Optional[float]: Epoch seconds, or None if the entry has no usable date
+    """
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    if parsed:
+        return float(calendar.timegm(parsed))
+    return parse_rfc822(entry.get("published") or entry.get("updated") or "")
+
+
+def fresh_entries(entries: Iterable, cutoff: float) -> List:
+    """
+    Filters a whole feed against the run's cutoff.
+
+    Args:
+        entries: feedparser entries
+        cutoff: Epoch seconds from run_cutoff()
+
+    Returns:
+        list: Entries published at or after the cutoff (undated entries are dropped)
+    """
+    fresh = []
+    for entry in entries:
+        published = entry_timestamp(entry)
+        if published is not None and published >= cutoff:
+            fresh.append(entry)
+    return fresh
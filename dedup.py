@@ -0,0 +1,241 @@
+"""
+Battery Scout - Near-Duplicate Detection
+MinHash + LSH clustering of the per-run article pool so syndicated copies
+and translated coverage of the same story cost one AI call and one slot.
+
+Two passes share one union-find:
+- text shingles (word pairs, or character pairs for CJK) catch syndicated
+  copies and lightly edited rewrites in the same language;
+- language-independent "anchors" (numbers, acronyms, Latin-script names)
+  catch coverage of the same story in different languages; this pass only
+  compares articles whose languages differ.
+
+Headlines are short and Google News snippets mostly repeat them, so both
+passes are strict: short texts must match exactly, and capitalized words
+only count as names outside Title-Case headlines and sentence starts.
+
+LSH keeps the work roughly linear in the pool size; candidate pairs are
+confirmed with an exact Jaccard check against the cluster's representative,
+so clusters never grow by chaining A~B~C.
+"""
+
+import hashlib
+import html
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+# --- CONFIGURATION ---
+NEAR_DUP_THRESHOLD = 0.7  # Jaccard similarity of text shingles
+MIN_SHINGLES = 6  # Texts with fewer shingles only match identical texts
+ANCHOR_THRESHOLD = 0.7  # Jaccard similarity of anchor tokens (cross-language)
+MIN_ANCHORS = 3  # Articles with fewer anchors skip the cross-language pass
+MIN_NAME_ANCHORS = 2  # ...and so do those with fewer non-numeric anchors (years alone prove nothing)
+NUM_PERM = 32
+BANDS = 8  # NUM_PERM / BANDS rows per band -> ~0.6 LSH threshold
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME or 1,
+     int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME)
+    for i in range(NUM_PERM)
+]
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]")
+_ANCHOR_RE = re.compile(r"\d+(?:[.,]\d+)?|[A-Za-z][A-Za-z0-9\-]+")
+_SENTENCE_END_RE = re.compile(r"(?:^|[.!?:;|\u3002\uff01\uff1f])\W*$")
+# Capitalized words that are never names on their own
+_COMMON_WORDS = frozenset(
+    "a an and as at by for from in into is it its new of on or over the to up with "
+    "battery batteries cell cells energy storage plant factory company market electric vehicle vehicles ev "
+    "opens launches unveils announces plans says report news update".split()
+)
+
+
+def normalize_text(text: str, remove: Iterable[str] = ()) -> str:
+    """
+    Strips HTML, entities and given boilerplate (e.g. the source name).
+
+    Args:
+        text: Title and/or snippet
+        remove: Substrings to drop before comparison
+
+    Returns:
+        str: Cleaned text
+    """
+    text = html.unescape(_TAG_RE.sub(" ", text or ""))
+    for phrase in remove:
+        if phrase:
+            text = text.replace(phrase, " ")
+    return " ".join(text.split())
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    """
+    Word 2-shingles of lowercased text; character bigrams for CJK text.
+
+    Returns:
+        frozenset: Shingle set (single tokens for very short texts)
+    """
+    lowered = text.lower()
+    if _CJK_RE.search(lowered):
+        chars = [c for c in lowered if not c.isspace()]
+        return frozenset("".join(chars[i:i + 2]) for i in range(max(1, len(chars) - 1)))
+    words = _WORD_RE.findall(lowered)
+    if len(words) < 2:
+        return frozenset(words)
+    return frozenset(f"{words[i]} {words[i + 1]}" for i in range(len(words) - 1))
+
+
+def anchors(text: str) -> FrozenSet[str]:
+    """
+    Language-independent tokens: numbers, acronyms and Latin-script names.
+
+    A capitalized word is a name only if it does not start a sentence, is not
+    a common word and the text is not a Title-Case headline (where every word
+    is capitalized and names cannot be told apart).
+
+    Returns:
+        frozenset: Lowercased anchor tokens
+    """
+    matches = list(_ANCHOR_RE.finditer(text))
+    words = [m.group() for m in matches if m.group()[0].isalpha()]
+    long_words = [w for w in words if len(w) > 3]
+    # Latin words inside CJK text are names; in English, mostly-capitalized text is a headline
+    headline_case = (not _CJK_RE.search(text) and bool(long_words)
+                     and sum(w[0].isupper() for w in long_words) > 0.6 * len(long_words))
+
+    found = set()
+    for match in matches:
+        token = match.group()
+        if token[0].isdigit():
+            found.add(token.replace(",", "."))
+        elif sum(c.isupper() for c in token) >= 2 or any(c.isdigit() for c in token):
+            found.add(token.lower())  # Acronyms and model names (CATL, LFP, 4680, NCM811)
+        elif (token[0].isupper() and not headline_case and token.lower() not in _COMMON_WORDS
+              and not _SENTENCE_END_RE.search(text[:match.start()])):
+            found.add(token.lower())
+    return frozenset(found)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two sets (0.0 when both are empty)."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(features: Iterable[str]) -> List[int]:
+    """
+    MinHash signature of a feature set.
+
+    Returns:
+        list: NUM_PERM minimum hash values
+    """
+    hashes = [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big")
+              for f in features]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERM
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # Keep the lower index as root (earliest article wins ties)
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def _link_similar(feature_sets: Sequence[FrozenSet[str]], threshold: float, uf: _UnionFind,
+                  min_features: int = 0, langs: Optional[Sequence[str]] = None):
+    # Candidates are compared representative to representative (the cluster
+    # roots), and with `langs` only across languages
+    rows = NUM_PERM // BANDS
+    buckets: Dict[tuple, List[int]] = {}
+    for i, features in enumerate(feature_sets):
+        if not features:
+            continue
+        signature = minhash(features)
+        for band in range(BANDS):
+            key = (band, tuple(signature[band * rows:(band + 1) * rows]))
+            members = buckets.setdefault(key, [])
+            for j in members:
+                ri, rj = uf.find(i), uf.find(j)
+                if ri == rj or (langs is not None and langs[ri] == langs[rj]):
+                    continue
+                mine, other = feature_sets[ri], feature_sets[rj]
+                if min(len(mine), len(other)) < min_features:
+                    similar = mine == other
+                else:
+                    similar = jaccard(mine, other) >= threshold
+                if similar:
+                    uf.union(ri, rj)
+            members.append(i)
+
+
+def _enough_anchors(anchor_set: FrozenSet[str]) -> bool:
+    names = sum(1 for token in anchor_set if not token[0].isdigit())
+    return len(anchor_set) >= MIN_ANCHORS and names >= MIN_NAME_ANCHORS
+
+
+def cluster_texts(texts: Sequence[str], langs: Optional[Sequence[str]] = None) -> List[int]:
+    """
+    Clusters near-duplicate texts.
+
+    Args:
+        texts: Normalized texts (title + snippet)
+        langs: Language code per text; the anchor pass only links texts in
+            different languages (None skips the anchor pass)
+
+    Returns:
+        list: Cluster id (index of the cluster's first text) for each text
+    """
+    uf = _UnionFind(len(texts))
+    _link_similar([shingles(t) for t in texts], NEAR_DUP_THRESHOLD, uf, min_features=MIN_SHINGLES)
+    if langs is not None:
+        anchor_sets = [anchors(t) for t in texts]
+        _link_similar([a if _enough_anchors(a) else frozenset() for a in anchor_sets], ANCHOR_THRESHOLD, uf,
+                      langs=langs)
+    return [uf.find(i) for i in range(len(texts))]
+
+
+def collapse_near_duplicates(articles: Sequence[dict]) -> Dict[int, dict]:
+    """
+    Picks one representative per near-duplicate cluster.
+
+    English originals are preferred (no translation needed), then the
+    longest snippet, then pool order.
+
+    Args:
+        articles: Article dicts with title, snippet, source, is_translated, lang
+
+    Returns:
+        dict: id(article) -> representative article dict
+    """
+    texts = [
+        normalize_text(f"{a['title']} {a.get('snippet', '')}", remove=(a.get("source", ""),))
+        for a in articles
+    ]
+    clusters: Dict[int, List[int]] = {}
+    langs = [a.get("lang", "en") for a in articles]
+    for i, cluster in enumerate(cluster_texts(texts, langs)):
+        clusters.setdefault(cluster, []).append(i)
+
+    representatives = {}
+    for members in clusters.values():
+        best = min(members, key=lambda i: (articles[i].get("is_translated", False), -len(texts[i]), i))
+        for i in members:
+            representatives[id(articles[i])] = articles[best]
+    return representatives
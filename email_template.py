@@ -4,15 +4,13 @@ Modern, mobile-responsive HTML email templates
 """
 
 from datetime import datetime
+from functools import lru_cache
+from string import Formatter
 
-def get_email_header():
-    """
-    Generate email header with branding and date
-    Returns: HTML string
-    """
-    today = datetime.now().strftime("%B %d, %Y")
+# --- TEMPLATE SKELETONS ---
+# Static markup with {placeholders}; compiled once at import by _compile()
 
-    return f"""
+HEADER_TEMPLATE = """
     <div style="max-width: 600px; margin: 0 auto; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;">
         <!-- Header -->
         <table width="100%" cellpadding="0" cellspacing="0" style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px 20px; border-radius: 8px 8px 0 0;">
@@ -35,7 +33,7 @@ def get_email_header():
         <table width="100%" cellpadding="0" cellspacing="0" style="background: #ffffff; padding: 20px;">
             <tr>
                 <td style="color: #4a5568; font-size: 14px; line-height: 1.6;">
-                    Here are your personalized updates from the last 24 hours:
+                    {intro}
                 </td>
             </tr>
         </table>
@@ -43,17 +41,7 @@ def get_email_header():
         <div style="height: 2px; background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);"></div>
     """
 
-
-def get_topic_section_header(topic_name):
-    """
-    Generate topic section header
-
-    Args:
-        topic_name: Name of the topic
-
-    Returns: HTML string
-    """
-    return f"""
+TOPIC_HEADER_TEMPLATE = """
     <table width="100%" cellpadding="0" cellspacing="0" style="background: #f7fafc; padding: 16px 20px; margin-top: 20px;">
         <tr>
             <td>
@@ -65,36 +53,7 @@ def get_topic_section_header(topic_name):
     </table>
     """
 
-
-def get_article_card(title, link, date, source="Unknown", summary="", is_chinese=False):
-    """
-    Generate article card with modern design
-
-    Args:
-        title: Article title
-        link: Article URL
-        date: Publication date
-        source: News source (e.g., "Reuters", "Bloomberg")
-        summary: AI-generated summary
-        is_chinese: Whether this is a Chinese article
-
-    Returns: HTML string
-    """
-    # Clean up date (take first 16 chars if longer)
-    display_date = date[:16] if len(date) > 16 else date
-
-    # Translated article note (for any non-English article)
-    translated_note = ""
-    if is_chinese:  # is_chinese is used for ALL translated articles now
-        translated_note = f"""
-        <div style="margin-top: 8px;">
-            <a href='{link}' style="color: #718096; font-size: 12px; text-decoration: none;">
-                [View Original Source →]
-            </a>
-        </div>
-        """
-
-    return f"""
+ARTICLE_CARD_TEMPLATE = """
     <table width="100%" cellpadding="0" cellspacing="0" style="background: #ffffff; padding: 16px 20px; border-left: 4px solid #667eea; margin-top: 12px; box-shadow: 0 1px 3px rgba(0,0,0,0.1);">
         <tr>
             <td>
@@ -106,11 +65,7 @@ def get_article_card(title, link, date, source="Unknown", summary="", is_chinese
                 </div>
 
                 <!-- AI Summary -->
-                {f'''
-                <div style="color: #4a5568; font-size: 14px; line-height: 1.5; margin-top: 8px; padding-left: 12px; border-left: 3px solid #667eea;">
-                    {summary}
-                </div>
-                ''' if summary else ''}
+                {summary_block}
 
                 <!-- Metadata (Source & Date) -->
                 <div style="margin-top: 8px;">
@@ -126,26 +81,27 @@ def get_article_card(title, link, date, source="Unknown", summary="", is_chinese
     </table>
     """
 
+SUMMARY_TEMPLATE = """
+                <div style="color: #4a5568; font-size: 14px; line-height: 1.5; margin-top: 8px; padding-left: 12px; border-left: 3px solid #667eea;">
+                    {summary}
+                </div>
+                """
 
-def get_email_footer(unsubscribe_url="", signup_url="https://battery-scout.streamlit.app"):
-    """
-    Generate email footer with branding, signup CTA, donation, and unsubscribe
-
-    Args:
-        unsubscribe_url: URL for unsubscribing
-        signup_url: URL for new subscribers to sign up
+TRANSLATED_NOTE_TEMPLATE = """
+        <div style="margin-top: 8px;">
+            <a href='{link}' style="color: #718096; font-size: 12px; text-decoration: none;">
+                [View Original Source →]
+            </a>
+        </div>
+        """
 
-    Returns: HTML string
-    """
-    unsubscribe_link = ""
-    if unsubscribe_url:
-        unsubscribe_link = f"""
+UNSUBSCRIBE_TEMPLATE = """
         <p style="color: #a0aec0; font-size: 11px; margin: 8px 0 0 0; text-align: center;">
             Don't want these emails? <a href="{unsubscribe_url}" style="color: #667eea; text-decoration: underline;">Unsubscribe</a>
         </p>
         """
 
-    return f"""
+FOOTER_TEMPLATE = """
         <!-- New Subscriber CTA -->
         <div style="height: 2px; background: linear-gradient(90deg, #667eea 0%, #764ba2 100%); margin-top: 30px;"></div>
 
@@ -202,7 +158,7 @@ def get_email_footer(unsubscribe_url="", signup_url="https://battery-scout.strea
 
                     <p style="color: #cbd5e0; font-size: 10px; margin: 16px 0 0 0;">
                         You're receiving this because you subscribed to Battery Scout updates.<br>
-                        © {datetime.now().year} Battery Scout. All rights reserved.
+                        © {year} Battery Scout. All rights reserved.
                     </p>
                 </td>
             </tr>
@@ -224,3 +180,280 @@ def get_email_footer(unsubscribe_url="", signup_url="https://battery-scout.strea
         }}
     </style>
     """
+
+TEXT_RULE = "-" * 60
+
+
+def _compile(template):
+    """
+    Split a template into alternating literal chunks and field names
+
+    Args:
+        template: str.format-style template
+
+    Returns: Tuple of (literal, field_name or None) pairs
+    """
+    return tuple(
+        (literal, field_name)
+        for literal, field_name, _, _ in Formatter().parse(template)
+    )
+
+
+def _fill(compiled, values, out):
+    """
+    Append a compiled template's pieces to an output list (no string copies)
+
+    Args:
+        compiled: Result of _compile()
+        values: Dict of field values
+        out: List the pieces are appended to
+    """
+    for literal, field_name in compiled:
+        if literal:
+            out.append(literal)
+        if field_name is not None:
+            out.append(str(values[field_name]))
+
+
+_HEADER = _compile(HEADER_TEMPLATE)
+_TOPIC_HEADER = _compile(TOPIC_HEADER_TEMPLATE)
+_ARTICLE_CARD = _compile(ARTICLE_CARD_TEMPLATE)
+_SUMMARY = _compile(SUMMARY_TEMPLATE)
+_TRANSLATED_NOTE = _compile(TRANSLATED_NOTE_TEMPLATE)
+_UNSUBSCRIBE = _compile(UNSUBSCRIBE_TEMPLATE)
+_FOOTER = _compile(FOOTER_TEMPLATE)
+
+
+def _render(compiled, **values):
+    out = []
+    _fill(compiled, values, out)
+    return "".join(out)
+
+
+DAILY_INTRO = "Here are your personalized updates from the last 24 hours:"
+
+
+@lru_cache(maxsize=8)
+def _header_for(today, intro):
+    return _render(_HEADER, today=today, intro=intro)
+
+
+def get_email_header(intro=DAILY_INTRO):
+    """
+    Generate email header with branding and date
+
+    Args:
+        intro: Intro line under the header
+
+    Returns: HTML string
+    """
+    return _header_for(datetime.now().strftime("%B %d, %Y"), intro)
+
+
+def get_topic_section_header(topic_name):
+    """
+    Generate topic section header
+
+    Args:
+        topic_name: Name of the topic
+
+    Returns: HTML string
+    """
+    return _render(_TOPIC_HEADER, topic_name=topic_name)
+
+
+def _card_parts(out, title, link, date, source="Unknown", summary="", is_chinese=False):
+    # Clean up date (take first 16 chars if longer)
+    display_date = date[:16] if len(date) > 16 else date
+
+    # Translated article note (for any non-English article)
+    translated_note = ""
+    if is_chinese:  # is_chinese is used for ALL translated articles now
+        translated_note = _render(_TRANSLATED_NOTE, link=link)
+
+    summary_block = _render(_SUMMARY, summary=summary) if summary else ""
+
+    _fill(_ARTICLE_CARD, {
+        "title": title,
+        "link": link,
+        "summary_block": summary_block,
+        "source": source,
+        "display_date": display_date,
+        "translated_note": translated_note
+    }, out)
+
+
+def get_article_card(title, link, date, source="Unknown", summary="", is_chinese=False):
+    """
+    Generate article card with modern design
+
+    Args:
+        title: Article title
+        link: Article URL
+        date: Publication date
+        source: News source (e.g., "Reuters", "Bloomberg")
+        summary: AI-generated summary
+        is_chinese: Whether this is a Chinese article
+
+    Returns: HTML string
+    """
+    out = []
+    _card_parts(out, title, link, date, source, summary, is_chinese)
+    return "".join(out)
+
+
+def _footer_parts(out, unsubscribe_url="", signup_url="https://battery-scout.streamlit.app"):
+    unsubscribe_link = ""
+    if unsubscribe_url:
+        unsubscribe_link = _render(_UNSUBSCRIBE, unsubscribe_url=unsubscribe_url)
+
+    _fill(_FOOTER, {
+        "signup_url": signup_url,
+        "unsubscribe_link": unsubscribe_link,
+        "year": datetime.now().year
+    }, out)
+
+
+def get_email_footer(unsubscribe_url="", signup_url="https://battery-scout.streamlit.app"):
+    """
+    Generate email footer with branding, signup CTA, donation, and unsubscribe
+
+    Args:
+        unsubscribe_url: URL for unsubscribing
+        signup_url: URL for new subscribers to sign up
+
+    Returns: HTML string
+    """
+    out = []
+    _footer_parts(out, unsubscribe_url, signup_url)
+    return "".join(out)
+
+
+def _topic_parts(html, text, topic_name):
+    _fill(_TOPIC_HEADER, {"topic_name": topic_name}, html)
+    text.extend(["", TEXT_RULE, topic_name.upper(), TEXT_RULE])
+
+
+def _article_parts(html, text, title, link, date, source="Unknown", summary="", is_chinese=False):
+    _card_parts(html, title, link, date, source, summary, is_chinese)
+    text.append("")
+    text.append(f"* {title}")
+    if summary:
+        text.append(f"  {summary}")
+    text.append(f"  {source} · {date[:16]}")
+    text.append(f"  {link}")
+
+
+def render_topic_section(topic_name, cards):
+    """
+    Render a topic header and its article cards as a reusable fragment
+
+    Args:
+        topic_name: Name of the topic
+        cards: List of dicts with get_article_card() keyword arguments
+
+    Returns: (html, text, article_count) tuple for DigestBuilder.add_section()
+    """
+    html, text = [], []
+    _topic_parts(html, text, topic_name)
+    for card in cards:
+        _article_parts(html, text, **card)
+    return "".join(html), "\n".join(text), len(cards)
+
+
+class SectionCache:
+    """
+    Per-run cache of rendered topic sections
+
+    A section depends only on its topic and articles, so subscribers who
+    share a topic (and get the same articles) reuse one rendered fragment.
+    """
+
+    def __init__(self):
+        self._fragments = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, topic_name, cards):
+        """
+        Return the fragment for key, rendering it on first use
+
+        Args:
+            key: Hashable identity of the section, e.g. (topic, article links)
+            topic_name: Name of the topic
+            cards: Callable returning the card dicts (only called on a miss)
+
+        Returns: Fragment from render_topic_section()
+        """
+        fragment = self._fragments.get(key)
+        if fragment is not None:
+            self.hits += 1
+            return fragment
+        self.misses += 1
+        fragment = render_topic_section(topic_name, cards())
+        self._fragments[key] = fragment
+        return fragment
+
+    def report(self):
+        """Print a one-line summary of section reuse for the run"""
+        print(f"🧩 Section cache: {self.misses} sections rendered, {self.hits} reused")
+
+
+class DigestBuilder:
+    """
+    Assemble one digest as HTML and plain text in a single pass
+
+    Pieces are collected in lists and joined once in finish(), instead of
+    growing a string with += for every section and card.
+    """
+
+    def __init__(self, intro=DAILY_INTRO):
+        self._html = [get_email_header(intro)]
+        self._text = [
+            "The Battery Scout Brief",
+            datetime.now().strftime("%B %d, %Y"),
+            "",
+            intro
+        ]
+        self.article_count = 0
+
+    def add_topic(self, topic_name):
+        """Append a topic section header"""
+        _topic_parts(self._html, self._text, topic_name)
+
+    def add_article(self, title, link, date, source="Unknown", summary="", is_chinese=False):
+        """Append an article card (same arguments as get_article_card)"""
+        _article_parts(self._html, self._text, title, link, date, source, summary, is_chinese)
+        self.article_count += 1
+
+    def add_section(self, fragment):
+        """Splice in a pre-rendered fragment from render_topic_section()"""
+        html, text, article_count = fragment
+        self._html.append(html)
+        self._text.append(text)
+        self.article_count += article_count
+
+    def finish(self, unsubscribe_url="", signup_url="https://battery-scout.streamlit.app"):
+        """
+        Close the digest with the footer
+
+        Args:
+            unsubscribe_url: URL for unsubscribing
+            signup_url: URL for new subscribers to sign up
+
+        Returns: (html, text) tuple
+        """
+        html = list(self._html)
+        _footer_parts(html, unsubscribe_url, signup_url)
+
+        text = self._text + [
+            "",
+            TEXT_RULE,
+            "New here? Subscribe for free: " + signup_url,
+            "Enjoying Battery Scout? https://buymeacoffee.com/batteryscout"
+        ]
+        if unsubscribe_url:
+            text.append("Unsubscribe: " + unsubscribe_url)
+        text.append(f"© {datetime.now().year} Battery Scout. All rights reserved.")
+
+        return "".join(html), "\n".join(text) + "\n"
@@ -0,0 +1,339 @@
+"""
+Battery Scout - Feed Fetching
+Run-scoped caching of Google News RSS feeds so each distinct query is
+downloaded and parsed only once per run, with concurrent prefetching and
+conditional (ETag / Last-Modified) requests backed by an on-disk store.
+"""
+
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import feedparser
+
+import storage
+from metrics import RUN_METRICS, percentile
+
+# --- FETCH CONFIGURATION ---
+FETCH_TIMEOUT = float(os.environ.get("FEED_FETCH_TIMEOUT", 15))  # seconds per request
+MAX_CONCURRENT_FETCHES = int(os.environ.get("FEED_FETCH_WORKERS", 8))
+MAX_FETCHES_PER_HOST = int(os.environ.get("FEED_FETCH_PER_HOST", 4))
+USER_AGENT = "BatteryScout/1.0 (+https://battery-scout.streamlit.app)"
+FEED_STORE_PATH = storage.state_path("feeds.sqlite3")
+FEED_STORE_MAX_AGE_DAYS = 30  # Drop stored feeds not fetched for this long
+
+
+def normalize_feed_url(url: str) -> str:
+    """
+    Normalizes a feed URL into a stable cache key.
+
+    Scheme and host are lowercased and query parameters are sorted, so the
+    same (q, hl, gl, ceid) query always maps to the same key regardless of
+    how the URL was assembled.
+
+    Args:
+        url: Feed URL
+
+    Returns:
+        str: Normalized URL
+    """
+    parts = urllib.parse.urlsplit(url.strip())
+    query = sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+    return urllib.parse.urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or "/",
+        urllib.parse.urlencode(query, quote_via=urllib.parse.quote),
+        ""
+    ))
+
+
+@RUN_METRICS.timed("feed.parse")
+def parse_feed(body: bytes):
+    """
+    Returns: feedparser.FeedParserDict for a downloaded (or stored) feed body
+    """
+    return feedparser.parse(body)
+
+
+@RUN_METRICS.timed("feed.fetch")
+def fetch_feed(url: str, timeout: float = FETCH_TIMEOUT):
+    """
+    Downloads and parses a single feed with a request timeout.
+
+    Network errors never raise; like feedparser itself, they yield an empty
+    feed with `bozo` set so callers can keep iterating `feed.entries`.
+
+    Args:
+        url: Feed URL
+        timeout: Socket timeout in seconds
+
+    Returns:
+        feedparser.FeedParserDict: Parsed feed
+    """
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+    except Exception as e:
+        print(f"⚠️  Feed fetch failed ({urllib.parse.urlsplit(url).netloc}): {e}")
+        return feedparser.FeedParserDict(entries=[], bozo=1, bozo_exception=e)
+    return parse_feed(body)
+
+
+class FeedStore:
+    """
+    Persistent store of feed bodies and HTTP validators between runs.
+
+    fetch() sends If-None-Match / If-Modified-Since with the validators from
+    the previous run; a 304 response is served from the stored body.
+    """
+
+    def __init__(self, path: str = FEED_STORE_PATH, max_age_days: float = FEED_STORE_MAX_AGE_DAYS):
+        """
+        Args:
+            path: SQLite database path
+            max_age_days: Stored feeds older than this are pruned on open
+        """
+        self._lock = threading.Lock()
+        self._conn = storage.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS feeds ("
+            " key TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " body BLOB NOT NULL,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM feeds WHERE fetched_at < ?", (time.time() - max_age_days * 86400,))
+        self._conn.commit()
+        # (url, status, bytes downloaded, bytes saved, seconds) per fetch
+        self.fetches: List[Tuple[str, int, int, int, float]] = []
+
+    def _load(self, key: str) -> Optional[Tuple[Optional[str], Optional[str], bytes]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, body FROM feeds WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _save(self, key: str, etag: Optional[str], last_modified: Optional[str], body: bytes):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds (key, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (key, etag, last_modified, body, time.time())
+            )
+            self._conn.commit()
+
+    def _touch(self, key: str):
+        with self._lock:
+            self._conn.execute("UPDATE feeds SET fetched_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    def fetch(self, url: str, timeout: float = FETCH_TIMEOUT):
+        """
+        Conditionally downloads and parses a feed.
+
+        Args:
+            url: Feed URL
+            timeout: Socket timeout in seconds
+
+        Returns:
+            feedparser.FeedParserDict: Parsed feed (empty with `bozo` set on errors)
+        """
+        key = normalize_feed_url(url)
+        stored = self._load(key)
+        headers = {"User-Agent": USER_AGENT}
+        if stored:
+            if stored[0]:
+                headers["If-None-Match"] = stored[0]
+            if stored[1]:
+                headers["If-Modified-Since"] = stored[1]
+
+        start = time.perf_counter()
+        try:
+            request = urllib.request.Request(url, headers=headers)
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                body = response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and stored:
+                self._touch(key)
+                self._record(url, 304, 0, len(stored[2]), time.perf_counter() - start)
+                return parse_feed(stored[2])
+            self._record(url, e.code, 0, 0, time.perf_counter() - start)
+            print(f"⚠️  Feed fetch failed ({urllib.parse.urlsplit(url).netloc}): {e}")
+            return feedparser.FeedParserDict(entries=[], bozo=1, bozo_exception=e)
+        except Exception as e:
+            self._record(url, 0, 0, 0, time.perf_counter() - start)
+            print(f"⚠️  Feed fetch failed ({urllib.parse.urlsplit(url).netloc}): {e}")
+            return feedparser.FeedParserDict(entries=[], bozo=1, bozo_exception=e)
+
+        self._record(url, 200, len(body), 0, time.perf_counter() - start)
+        if etag or last_modified:
+            self._save(key, etag, last_modified, body)
+        return parse_feed(body)
+
+    def _record(self, url: str, status: int, downloaded: int, saved: int, seconds: float):
+        with self._lock:
+            self.fetches.append((url, status, downloaded, saved, seconds))
+        RUN_METRICS.record("feed.fetch", seconds)
+        RUN_METRICS.incr(f"feed.status.{status or 'error'}")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns: Dictionary with fetch counts, bytes and latency percentiles (seconds)
+        """
+        latencies = [f[4] for f in self.fetches]
+        return {
+            "fetches": len(self.fetches),
+            "not_modified": sum(1 for f in self.fetches if f[1] == 304),
+            "errors": sum(1 for f in self.fetches if f[1] not in (200, 304)),
+            "bytes_downloaded": sum(f[2] for f in self.fetches),
+            "bytes_saved": sum(f[3] for f in self.fetches),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95)
+        }
+
+    def report(self, per_feed: bool = True):
+        """
+        Prints conditional-fetch results for the run.
+
+        Args:
+            per_feed: Also print one line per feed (status, bytes, latency)
+        """
+        if per_feed:
+            for url, status, downloaded, saved, seconds in self.fetches:
+                query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+                label = f"{query.get('q', [url])[0][:40]} [{query.get('hl', ['?'])[0]}]"
+                print(f"   {status or 'ERR'} {label}: {downloaded / 1024:.1f} KB down, "
+                      f"{saved / 1024:.1f} KB saved, {seconds * 1000:.0f} ms")
+        stats = self.stats()
+        print(f"💽 Feed store: {stats['fetches']} fetches, {stats['not_modified']} not modified, "
+              f"{stats['errors']} errors, {stats['bytes_downloaded'] / 1024:.0f} KB downloaded, "
+              f"{stats['bytes_saved'] / 1024:.0f} KB saved, p50 {stats['p50'] * 1000:.0f} ms / "
+              f"p95 {stats['p95'] * 1000:.0f} ms")
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class FeedCache:
+    """
+    Per-run cache of parsed feeds keyed on the normalized query URL.
+
+    Create one instance per run; it is never persisted, so every run still
+    sees fresh news.
+    """
+
+    def __init__(self, fetcher: Callable[[str], Any] = fetch_feed):
+        """
+        Args:
+            fetcher: Callable that downloads and parses a feed URL
+        """
+        self._fetcher = fetcher
+        self._feeds: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self._unclaimed = set()  # Prefetched feeds not yet read (their miss is already counted)
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+
+    def __contains__(self, url: str) -> bool:
+        return normalize_feed_url(url) in self._feeds
+
+    def __len__(self) -> int:
+        return len(self._feeds)
+
+    def get(self, url: str):
+        """
+        Returns the parsed feed for a URL, fetching it on first use.
+
+        Args:
+            url: Feed URL
+
+        Returns:
+            feedparser.FeedParserDict: Parsed feed
+        """
+        key = normalize_feed_url(url)
+        if key in self._unclaimed:
+            # First read of a prefetched feed: not a repeat lookup
+            self._unclaimed.discard(key)
+            return self._feeds[key]
+        if key in self._feeds:
+            self.hits += 1
+            return self._feeds[key]
+
+        self.misses += 1
+        feed = self._fetcher(url)
+        self._feeds[key] = feed
+        return feed
+
+    def prefetch(self, urls: Iterable[str], max_workers: int = MAX_CONCURRENT_FETCHES,
+                 per_host: int = MAX_FETCHES_PER_HOST) -> int:
+        """
+        Downloads all distinct, not yet cached feeds concurrently.
+
+        Parallelism is capped overall by `max_workers` and per host by
+        `per_host`, so a run against a single host (news.google.com) stays
+        polite. Later `get()` calls for these URLs are served from the cache;
+        each prefetched feed counts as one miss, and only repeat reads of it
+        count as hits.
+
+        Args:
+            urls: Feed URLs needed for this run (duplicates are fine)
+            max_workers: Maximum concurrent downloads
+            per_host: Maximum concurrent downloads against one host
+
+        Returns:
+            int: Number of feeds fetched
+        """
+        pending = {}
+        for url in urls:
+            key = normalize_feed_url(url)
+            if key not in self._feeds and key not in pending:
+                pending[key] = url
+
+        if not pending:
+            return 0
+
+        def fetch(item):
+            key, url = item
+            with self._host_slot(urllib.parse.urlsplit(url).netloc.lower(), per_host):
+                return key, self._fetcher(url)
+
+        print(f"📡 Fetching {len(pending)} feeds ({max(1, max_workers)} workers)...")
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            for key, feed in pool.map(fetch, pending.items()):
+                self._feeds[key] = feed
+        self._unclaimed.update(pending)
+        self.misses += len(pending)
+        self.prefetched += len(pending)
+        return len(pending)
+
+    def _host_slot(self, host: str, per_host: int) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(max(1, per_host))
+            return self._host_slots[host]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns: Dictionary with hit, miss, prefetched and distinct feed counts
+        """
+        return {"hits": self.hits, "misses": self.misses, "prefetched": self.prefetched, "feeds": len(self._feeds)}
+
+    def report(self):
+        """Prints a one-line summary of cache usage for the run."""
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        print(f"🗂️  Feed cache: {len(self._feeds)} feeds fetched ({self.prefetched} prefetched), "
+              f"{self.hits} hits / {self.misses} misses ({hit_rate:.0f}% hit rate)")
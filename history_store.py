@@ -0,0 +1,158 @@
+"""
+Battery Scout - History Store
+Compact, indexed record of already-sent article URLs and arXiv IDs.
+
+Each ID is stored as a fixed-size 8-byte hash in an indexed SQLite table,
+so startup cost does not grow with history size and writes are batched
+into one transaction per run.
+"""
+
+import hashlib
+import os
+import time
+from typing import Iterable, Set
+
+import storage
+
+# --- CONFIGURATION ---
+HISTORY_DB_PATH = storage.state_path("history.sqlite3")
+HISTORY_MAX_AGE_DAYS = 365  # Entries older than this are pruned
+
+
+def id_hash(entry_id: str) -> int:
+    """
+    Hashes an ID to a signed 64-bit integer (fits SQLite INTEGER).
+
+    Args:
+        entry_id: Article URL or arXiv ID
+
+    Returns:
+        int: 8-byte BLAKE2b digest as a signed integer
+    """
+    digest = hashlib.blake2b(entry_id.strip().encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class HistoryStore:
+    """
+    Set-like store of sent IDs: `id in store`, `store.add(id)`, `store.flush()`.
+
+    Lookups go straight to the primary-key index; nothing is loaded at
+    startup. Added IDs are buffered in memory until flush().
+    """
+
+    def __init__(self, path: str = HISTORY_DB_PATH, max_age_days: float = HISTORY_MAX_AGE_DAYS):
+        """
+        Args:
+            path: SQLite database path
+            max_age_days: Entries older than this are pruned on open
+        """
+        self._conn = storage.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " hash INTEGER PRIMARY KEY,"
+            " added_at INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_added ON history(added_at)")
+        self._conn.commit()
+        self._pending: Set[int] = set()
+        if max_age_days:
+            self.prune(max_age_days)
+
+    def __contains__(self, entry_id: str) -> bool:
+        key = id_hash(entry_id)
+        if key in self._pending:
+            return True
+        return self._conn.execute("SELECT 1 FROM history WHERE hash = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0] + len(self._pending)
+
+    def contains_many(self, entry_ids: Iterable[str]) -> Set[str]:
+        """
+        Bulk membership test.
+
+        Args:
+            entry_ids: Candidate IDs
+
+        Returns:
+            set: The subset of entry_ids already in history
+        """
+        by_hash = {}
+        for entry_id in entry_ids:
+            by_hash.setdefault(id_hash(entry_id), []).append(entry_id)
+
+        found = set()
+        keys = list(by_hash)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT hash FROM history WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for (key,) in rows:
+                found.update(by_hash[key])
+        for key in self._pending & by_hash.keys():
+            found.update(by_hash[key])
+        return found
+
+    def add(self, entry_id: str):
+        """Buffers an ID; it is written on the next flush()."""
+        self._pending.add(id_hash(entry_id))
+
+    def flush(self) -> int:
+        """
+        Writes all buffered IDs in one transaction.
+
+        Returns:
+            int: Number of IDs written
+        """
+        if not self._pending:
+            return 0
+        now = int(time.time())
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO history (hash, added_at) VALUES (?, ?)",
+                ((key, now) for key in self._pending)
+            )
+        written = len(self._pending)
+        self._pending.clear()
+        return written
+
+    def prune(self, max_age_days: float) -> int:
+        """
+        Deletes entries older than max_age_days.
+
+        Returns:
+            int: Number of entries removed
+        """
+        cutoff = int(time.time() - max_age_days * 86400)
+        with self._conn:
+            return self._conn.execute("DELETE FROM history WHERE added_at < ?", (cutoff,)).rowcount
+
+    def import_file(self, path: str) -> int:
+        """
+        One-time migration from the legacy flat history file (one ID per line).
+
+        Only runs while the store is empty, so it is safe to call every start.
+
+        Args:
+            path: Path to history.txt
+
+        Returns:
+            int: Number of IDs imported
+        """
+        if not os.path.exists(path):
+            return 0
+        if self._conn.execute("SELECT 1 FROM history LIMIT 1").fetchone() is not None:
+            return 0
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    self.add(line)
+        return self.flush()
+
+    def close(self):
+        """Flushes pending IDs and closes the database."""
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,209 @@
+"""
+Battery Scout - SMTP Delivery
+Pooled, persistent SMTP sender: log in once per connection per run, reuse
+the connection for every message and reconnect transparently if dropped.
+"""
+
+import queue
+import smtplib
+import socket
+import ssl
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import percentile
+
+# --- CONFIGURATION ---
+SMTP_TIMEOUT = 30  # seconds
+SMTP_CONNECTIONS = 2  # Parallel authenticated connections per run
+
+# Errors after which a connection is dropped and re-established
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, socket.timeout, ConnectionError)
+
+
+class SMTPSender:
+    """
+    Keeps a small pool of authenticated SMTP connections open for a run.
+
+    security is 'ssl' (SMTP_SSL, port 465), 'starttls' (port 587) or
+    'plain' (no TLS, for local test servers).
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, security: str = "ssl",
+                 connections: int = SMTP_CONNECTIONS, timeout: float = SMTP_TIMEOUT,
+                 smtp_factory: Optional[Callable[[], smtplib.SMTP]] = None):
+        """
+        Args:
+            host: SMTP server host
+            port: SMTP server port
+            username: Login user (skip login if None)
+            password: Login password
+            security: 'ssl', 'starttls' or 'plain'
+            connections: Maximum parallel connections
+            timeout: Socket timeout in seconds
+            smtp_factory: Optional callable returning an unauthenticated SMTP object
+        """
+        if security not in ("ssl", "starttls", "plain"):
+            raise ValueError(f"Unknown SMTP security mode: {security}")
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = security
+        self.connections = max(1, connections)
+        self.timeout = timeout
+        self._smtp_factory = smtp_factory
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.connections)
+        self._lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.sent = 0
+        self.failed = 0
+        self.reconnects = 0
+        self.logins = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._smtp_factory is not None:
+            smtp = self._smtp_factory()
+        elif self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout,
+                                    context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == "starttls":
+                smtp.starttls(context=ssl.create_default_context())
+        if self.username:
+            smtp.login(self.username, self.password)
+            with self._lock:
+                self.logins += 1
+        return smtp
+
+    def _discard(self, smtp: smtplib.SMTP):
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+    def _checkout(self) -> smtplib.SMTP:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def send(self, from_addr: str, to_addr: str, message: str):
+        """
+        Sends one message over a pooled connection.
+
+        A dropped or timed-out connection is replaced and the message retried
+        once; any other SMTP error propagates to the caller.
+
+        Args:
+            from_addr: Envelope sender
+            to_addr: Envelope recipient
+            message: Full RFC 822 message text
+        """
+        with self._slots:
+            start = time.perf_counter()
+            smtp = self._checkout()
+            try:
+                smtp.sendmail(from_addr, to_addr, message)
+            except RECONNECT_ERRORS:
+                self._discard(smtp)
+                with self._lock:
+                    self.reconnects += 1
+                smtp = None
+                try:
+                    smtp = self._connect()
+                    smtp.sendmail(from_addr, to_addr, message)
+                except Exception:
+                    if smtp is not None:
+                        self._discard(smtp)
+                    with self._lock:
+                        self.failed += 1
+                    raise
+            except Exception:
+                self._idle.put(smtp)
+                with self._lock:
+                    self.failed += 1
+                raise
+            self._idle.put(smtp)
+            with self._lock:
+                self.sent += 1
+                self.latencies.append(time.perf_counter() - start)
+
+    def send_many(self, messages: Iterable[Tuple[str, str, str]]) -> List[Optional[Exception]]:
+        """
+        Drains a queue of messages across the connection pool in parallel.
+
+        Args:
+            messages: (from_addr, to_addr, message) tuples
+
+        Returns:
+            list: One entry per message, None on success or the exception on failure
+        """
+        jobs: "queue.Queue[Tuple[int, Tuple[str, str, str]]]" = queue.Queue()
+        for item in enumerate(messages):
+            jobs.put(item)
+
+        results: List[Optional[Exception]] = [None] * jobs.qsize()
+
+        def worker():
+            while True:
+                try:
+                    index, (from_addr, to_addr, message) = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    self.send(from_addr, to_addr, message)
+                    print(f"✅ Sent email to {to_addr}")
+                except Exception as e:
+                    results[index] = e
+                    print(f"❌ Failed to send to {to_addr}: {e}")
+
+        threads = [threading.Thread(target=worker) for _ in range(min(self.connections, jobs.qsize()))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns: Dictionary with send counts and latency percentiles (seconds)
+        """
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "logins": self.logins,
+            "reconnects": self.reconnects,
+            "p50": percentile(self.latencies, 50),
+            "p95": percentile(self.latencies, 95),
+            "max": max(self.latencies, default=0.0)
+        }
+
+    def report(self):
+        """Prints a one-line summary of delivery for the run."""
+        stats = self.stats()
+        print(f"📮 SMTP: {stats['sent']} sent, {stats['failed']} failed, {stats['logins']} logins, "
+              f"{stats['reconnects']} reconnects, p50 {stats['p50'] * 1000:.0f} ms / "
+              f"p95 {stats['p95'] * 1000:.0f} ms per message")
+
+    def close(self):
+        """Closes every pooled connection."""
+        while True:
+            try:
+                smtp = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                smtp.quit()
+            except Exception:
+                pass
@@ -1,55 +1,64 @@
-import feedparser
 import urllib.parse
-import pandas as pd
-import time
-import smtplib
 import os
+import functools
+import time
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
+from feeds import FeedCache, FeedStore
+from mailer import SMTPSender
+from history_store import HistoryStore
+from subscriber_store import SheetSubscriberStore, sync_snapshot
+from query_plan import simplify_topic, english_query
+from topic_query import compile_query
+from date_filter import entry_timestamp
+from ranking import score_article, top_k
+from metrics import RUN_METRICS
 
 # --- CONFIGURATION ---
 YOUR_EMAIL = os.environ.get("EMAIL_ADDRESS")
 YOUR_APP_PASSWORD = os.environ.get("EMAIL_PASSWORD")
-HISTORY_FILE = "history.txt"
+HISTORY_FILE = "history.txt"  # Legacy flat file, imported once into the history store
 SHEET_NAME = "Battery Subscribers" # <--- MATCH YOUR GOOGLE SHEET NAME
 
 # --- GOOGLE SHEETS SETUP ---
 SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 
+@RUN_METRICS.timed("sheet.subscribers")
 def get_subscribers_from_sheet():
-    """Reads the Google Sheet and returns a DataFrame"""
+    """Syncs the local subscriber snapshot from the Google Sheet and returns it"""
     try:
         creds = ServiceAccountCredentials.from_json_keyfile_name("credentials.json", SCOPE)
         client = gspread.authorize(creds)
         sheet = client.open(SHEET_NAME).sheet1
-        
-        # Get all values
-        data = sheet.get_all_values()
-        
-        # Convert to DataFrame (assuming Row 1 is headers: "Email", "Topics")
-        if not data:
-            return pd.DataFrame()
-            
-        headers = data.pop(0) 
-        df = pd.DataFrame(data, columns=headers)
-        return df
+        # Column 0 = Email, 1 = Topics, whatever the header row says
+        return sync_snapshot(SheetSubscriberStore(sheet.get, "A:C"))
     except Exception as e:
         print(f"❌ Error connecting to Google Sheets: {e}")
-        return pd.DataFrame()
+        return None
 
 # --- HELPER FUNCTIONS ---
+@functools.lru_cache(maxsize=None)
+def build_search(topic):
+    """Returns (simple_topic, search_term, rss_url) for a subscriber topic, compiled once per run"""
+    # '("silicon anode" OR "Si-anode")' -> '("silicon anode" OR "Si-anode") battery'
+    simple_topic = simplify_topic(topic)
+    search_term = english_query(topic, keywords=("battery", "storage"))
+
+    safe_query = urllib.parse.quote(search_term)
+    url = f"https://news.google.com/rss/search?q={safe_query}+when:7d&hl=en-CA&gl=CA&ceid=CA:en"
+    return simple_topic, search_term, url
+
 def load_history():
-    if not os.path.exists(HISTORY_FILE):
-        return set()
-    with open(HISTORY_FILE, "r") as f:
-        return set(line.strip() for line in f)
+    """Opens the indexed history store (nothing is read into memory)"""
+    history = HistoryStore()
+    history.import_file(HISTORY_FILE)
+    return history
 
-def save_to_history(entry_id):
-    with open(HISTORY_FILE, "a") as f:
-        f.write(f"{entry_id}\n")
+# One STARTTLS login per connection per run, reused for every email
+mailer = SMTPSender('smtp.gmail.com', 587, YOUR_EMAIL, YOUR_APP_PASSWORD, security="starttls", connections=1)
 
 def send_email(to_email, subject, body):
     msg = MIMEMultipart()
@@ -59,13 +68,12 @@ def send_email(to_email, subject, body):
     msg.attach(MIMEText(body, 'html'))
 
     try:
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(YOUR_EMAIL, YOUR_APP_PASSWORD)
-        server.sendmail(YOUR_EMAIL, to_email, msg.as_string())
-        server.quit()
+        with RUN_METRICS.span("smtp.send"):
+            mailer.send(YOUR_EMAIL, to_email, msg.as_string())
+        RUN_METRICS.incr("smtp.sent")
         print(f"✅ Email sent to {to_email}")
     except Exception as e:
+        RUN_METRICS.incr("smtp.failed")
         print(f"❌ Failed to send email: {e}")
 
 # --- MAIN LOGIC ---
@@ -75,28 +83,30 @@ sent_papers = load_history()
 
 # 1. READ FROM GOOGLE SHEETS INSTEAD OF CSV
 print("   Connecting to Google Sheets...")
-df = get_subscribers_from_sheet()
+subscribers = get_subscribers_from_sheet()
 
-if df.empty:
+if subscribers is None or subscribers.count() == 0:
     print("No subscribers found in the Sheet!")
     exit()
 else:
-    print(f"   Found {len(df)} subscribers.")
-
-for index, row in df.iterrows():
-    user_email = row['0'] if '0' in row else row.iloc[0] # Handle messy headers
-    raw_topics = row['1'] if '1' in row else row.iloc[1]
-    
-    # Just in case the sheet headers are messy, we force column 0=Email, 1=Topics
-    # Or if you named headers in the sheet, use row['Email']
-    
-    # Safety check
-    if not user_email or "@" not in user_email:
-        continue
-        
-    topics = raw_topics.split("|")
+    print(f"   Found {subscribers.count()} subscribers.")
+
+# 2. FETCH EVERY DISTINCT FEED UP FRONT (concurrently, once per run)
+feed_store = FeedStore()
+feed_cache = FeedCache(feed_store.fetch)
+with RUN_METRICS.span("stage.fetch"):
+    feed_cache.prefetch(
+        build_search(topic)[2]
+        for subscriber in subscribers.iter_subscribers()
+        for topic in subscriber.topic_list
+    )
+
+for subscriber in subscribers.iter_subscribers():
+    user_email = subscriber.email
+    topics = subscriber.topic_list
     
     print(f"\n📨 Processing: {user_email}")
+    render_start = time.perf_counter()
     
     email_content = "<h2>🔋 Daily Battery Industry Updates</h2><hr>"
     new_items_count = 0
@@ -104,30 +114,28 @@ for index, row in df.iterrows():
     for topic in topics:
         if not topic: continue
         
-        # CLEANUP: '("silicon anode" OR "Si-anode")' -> 'silicon anode battery'
-        simple_topic = topic.replace('(', '').replace(')', '').split(' OR ')[0].replace('"', '')
-        if "battery" not in simple_topic.lower() and "storage" not in simple_topic.lower():
-            search_term = f"{simple_topic} battery"
-        else:
-            search_term = simple_topic
-            
+        simple_topic, search_term, url = build_search(topic)
         print(f"   🔎 Scouting Google News for: '{search_term}'...")
-        safe_query = urllib.parse.quote(search_term)
-        url = f"https://news.google.com/rss/search?q={safe_query}+when:7d&hl=en-CA&gl=CA&ceid=CA:en"
-        
-        feed = feedparser.parse(url)
+        feed = feed_cache.get(url)
         topic_count = 0
         topic_header_added = False
-        
-        for entry in feed.entries:
-            if topic_count >= 5: break 
-            news_id = entry.link
-            
-            if news_id in sent_papers:
-                continue
 
-            if simple_topic.lower() not in entry.title.lower() and simple_topic.lower() not in entry.summary.lower():
-                continue
+        # One precompiled regex covers every alternative of the topic expression
+        matcher = compile_query(topic)
+        already_sent = sent_papers.contains_many(entry.link for entry in feed.entries)  # One bulk lookup per feed
+        candidates = [
+            entry for entry in feed.entries
+            if entry.link not in already_sent
+            and (matcher.search(entry.title) or matcher.search(entry.get("summary", "")))
+        ]
+        # Best 5 by relevance to the full topic expression, recency and source
+        now = time.time()
+        ranked = top_k(candidates, 5, key=lambda entry: score_article(
+            entry.title, entry.get("summary", ""), entry.get("source", {}).get("title", ""),
+            entry_timestamp(entry), matcher, now))
+
+        for entry in ranked:
+            news_id = entry.link
 
             if not topic_header_added:
                 email_content += f"<h3 style='color: #2E86C1;'>Topic: {simple_topic.title()}</h3>"
@@ -138,17 +146,26 @@ for index, row in df.iterrows():
             email_content += f"<p><strong><a href='{entry.link}'>{entry.title}</a></strong><br>"
             email_content += f"<span style='font-size: 12px; color: #666;'>{entry.published}</span></p>"
             
-            save_to_history(news_id)
             sent_papers.add(news_id)
             new_items_count += 1
             topic_count += 1
-        
-        time.sleep(1)
 
+    RUN_METRICS.record("render.digest", time.perf_counter() - render_start)
     if new_items_count > 0:
         print(f"   Found {new_items_count} updates. Sending email...")
         send_email(user_email, f"🔋 Battery Updates: {new_items_count} New Articles", email_content)
     else:
         print(f"   No new updates today.")
 
+sent_papers.close()  # Writes this run's IDs in one batch
+subscribers.close()
+mailer.close()
+mailer.report()
+feed_cache.report()
+feed_store.report()
+RUN_METRICS.cache("feed_cache", feed_cache.hits, feed_cache.misses)
+feed_stats = feed_store.stats()
+RUN_METRICS.cache("feed_not_modified", feed_stats["not_modified"], feed_stats["fetches"] - feed_stats["not_modified"])
+feed_store.close()
+RUN_METRICS.write_report()
 print("\n--- JOB COMPLETE ---")
\ No newline at end of file
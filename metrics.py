@@ -0,0 +1,157 @@
+"""
+Battery Scout - Run Metrics
+Statistics helpers shared by the per-run reports, plus the instrumentation
+layer (timed spans, counters, cache hit rates) behind the JSON run report.
+"""
+
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List
+
+import storage
+
+# --- CONFIGURATION ---
+RUN_REPORT_PATH = os.environ.get("SCOUT_RUN_REPORT", storage.state_path("run_report.json"))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of numbers.
+
+    Args:
+        values: Samples
+        pct: Percentile between 0 and 100
+
+    Returns:
+        float: Percentile value (0.0 for no samples)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Metrics:
+    """
+    Thread-safe run instrumentation: timed spans, counters and cache stats.
+
+    Usage:
+        with RUN_METRICS.span("feed.fetch"):
+            ...
+        RUN_METRICS.incr("ai.calls")
+        RUN_METRICS.cache("summary", hits=12, misses=3)
+        RUN_METRICS.write_report()
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            clock: High-resolution clock (injectable for tests)
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._timings: Dict[str, List[float]] = {}
+        self._counters: Dict[str, float] = {}
+        self._caches: Dict[str, Dict[str, int]] = {}
+        self._started_at = time.time()
+        self._started = clock()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Times the enclosed block under `name` (recorded even if it raises)."""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.record(name, self._clock() - start)
+
+    def timed(self, name: str) -> Callable:
+        """Decorator form of span()."""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name: str, seconds: float):
+        """Adds one duration sample."""
+        with self._lock:
+            self._timings.setdefault(name, []).append(seconds)
+
+    def incr(self, name: str, amount: float = 1):
+        """Increments a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def cache(self, name: str, hits: int, misses: int):
+        """Records a cache's hit/miss totals for the run."""
+        with self._lock:
+            self._caches[name] = {"hits": hits, "misses": misses}
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Builds the machine-readable run report.
+
+        Returns:
+            dict: started_at, wall_seconds, stages (count, total/p50/p95/max
+                seconds), counters and caches (with hit_rate)
+        """
+        with self._lock:
+            timings = {name: list(samples) for name, samples in self._timings.items()}
+            counters = dict(self._counters)
+            caches = {name: dict(stats) for name, stats in self._caches.items()}
+
+        stages = {
+            name: {
+                "count": len(samples),
+                "total_s": round(sum(samples), 4),
+                "p50_s": round(percentile(samples, 50), 4),
+                "p95_s": round(percentile(samples, 95), 4),
+                "max_s": round(max(samples), 4),
+            }
+            for name, samples in sorted(timings.items())
+        }
+        for stats in caches.values():
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return {
+            "started_at": datetime.fromtimestamp(self._started_at, timezone.utc).isoformat(),
+            "wall_seconds": round(self._clock() - self._started, 3),
+            "stages": stages,
+            "counters": dict(sorted(counters.items())),
+            "caches": dict(sorted(caches.items())),
+        }
+
+    def write_report(self, path: str = RUN_REPORT_PATH) -> Dict[str, Any]:
+        """
+        Writes the run report as JSON and prints the slowest stages.
+
+        Args:
+            path: Output file
+
+        Returns:
+            dict: The report
+        """
+        report = self.report()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        slowest = sorted(report["stages"].items(), key=lambda item: item[1]["total_s"], reverse=True)[:5]
+        summary = ", ".join(f"{name} {stats['total_s']:.1f}s" for name, stats in slowest)
+        print(f"⏱️  Run report ({report['wall_seconds']:.0f}s wall) written to {path}: {summary}")
+        return report
+
+
+# Process-wide instance shared by every module of a run
+RUN_METRICS = Metrics()
@@ -0,0 +1,300 @@
+"""
+Battery Scout - Outbox
+Durable SQLite outbox that decouples digest rendering from SMTP delivery,
+with retries, exponential backoff and idempotency keys.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import storage
+
+# --- CONFIGURATION ---
+OUTBOX_PATH = storage.state_path("outbox.sqlite3")
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_SECONDS = 5  # First retry delay, doubled on each attempt
+OUTBOX_MAX_AGE_HOURS = 20  # Undelivered digests older than this are never sent
+OUTBOX_RETENTION_DAYS = 3  # Finished messages are deleted after this (keys must outlive same-day reruns)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+EXPIRED = "expired"
+
+# Finished rows keep only their key and status (for idempotency): the rendered
+# message and addresses are personal data and are dropped as soon as they are done
+_SCRUB = "sender = '', recipient = '', message = ''"
+
+
+def idempotency_key(*parts: str) -> str:
+    """
+    Builds a stable key for a message, e.g. from (date, recipient, topics).
+
+    Enqueuing the same key twice is a no-op, so a rerun on the same day
+    never delivers a digest twice.
+
+    Args:
+        *parts: Values identifying the message
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class Outbox:
+    """
+    Queue of rendered messages persisted between runs.
+
+    Delivery is at-least-once: a message claimed by a worker when the
+    process died is retried on the next run. Only undelivered messages keep
+    their body; sent, failed and expired rows are scrubbed.
+    """
+
+    def __init__(self, path: str = OUTBOX_PATH, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 retry_seconds: float = OUTBOX_RETRY_SECONDS, max_age_hours: float = OUTBOX_MAX_AGE_HOURS,
+                 retention_days: float = OUTBOX_RETENTION_DAYS):
+        """
+        Args:
+            path: SQLite database path
+            max_attempts: Attempts before a message is marked failed
+            retry_seconds: First backoff delay in seconds
+            max_age_hours: Age after which undelivered messages expire
+            retention_days: Sent, failed and expired messages older than this are deleted on open
+        """
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.max_age_seconds = max_age_hours * 3600
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+        self._conn = storage.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " key TEXT PRIMARY KEY,"
+            " sender TEXT NOT NULL,"
+            " recipient TEXT NOT NULL,"
+            " message TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL,"
+            " sent_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox(status, next_attempt_at)")
+        # Recover from a crash mid-send, drop stale digests, then delete finished ones
+        now = time.time()
+        with self._conn:
+            self._conn.execute("UPDATE outbox SET status = ? WHERE status = ?", (PENDING, SENDING))
+            self._conn.execute(
+                f"UPDATE outbox SET status = ?, {_SCRUB} WHERE status = ? AND created_at < ?",
+                (EXPIRED, PENDING, now - self.max_age_seconds)
+            )
+            self._conn.execute(
+                "DELETE FROM outbox WHERE status IN (?, ?, ?) AND created_at < ?",
+                (SENT, FAILED, EXPIRED, now - retention_days * 86400)
+            )
+
+    def enqueue(self, key: str, sender: str, recipient: str, message: str) -> bool:
+        """
+        Adds a rendered message unless its key is already queued or sent.
+
+        A failed or expired message with the same key is replaced (its body
+        was scrubbed), so a rerun retries what was never delivered.
+
+        Args:
+            key: Idempotency key from idempotency_key()
+            sender: Envelope sender
+            recipient: Envelope recipient
+            message: Full RFC 822 message text
+
+        Returns:
+            bool: True if queued, False if the key is already pending or sent
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (key, sender, recipient, message, status, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET sender = excluded.sender, recipient = excluded.recipient,"
+                " message = excluded.message, status = excluded.status, attempts = 0,"
+                " next_attempt_at = excluded.next_attempt_at, last_error = NULL,"
+                " created_at = excluded.created_at, sent_at = NULL"
+                " WHERE outbox.status IN (?, ?)",
+                (key, sender, recipient, message, PENDING, now, now, FAILED, EXPIRED)
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def is_queued(self, key: str) -> bool:
+        """
+        Returns: True if a message with this key is waiting, being sent or was sent
+            (failed and expired messages may be enqueued again)
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM outbox WHERE key = ? AND status IN (?, ?, ?)", (key, PENDING, SENDING, SENT)
+            ).fetchone() is not None
+
+    def sent_keys(self, keys: Iterable[str]) -> Set[str]:
+        """
+        Returns: The subset of keys whose message was delivered
+        """
+        keys = list(keys)
+        sent = set()
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key FROM outbox WHERE status = ? AND key IN ({','.join('?' * len(chunk))})",
+                    [SENT] + chunk
+                ).fetchall()
+                sent.update(key for (key,) in rows)
+        return sent
+
+    def claim(self) -> Optional[Dict[str, str]]:
+        """
+        Atomically takes the next due message for delivery.
+
+        Returns:
+            Optional[dict]: Message row (key, sender, recipient, message, attempts), or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key, sender, recipient, message, attempts FROM outbox"
+                " WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT 1",
+                (PENDING, time.time())
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE outbox SET status = ? WHERE key = ?", (SENDING, row[0]))
+            self._conn.commit()
+        return {"key": row[0], "sender": row[1], "recipient": row[2], "message": row[3], "attempts": row[4]}
+
+    def mark_sent(self, key: str):
+        """Records a successful delivery."""
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE outbox SET status = ?, attempts = attempts + 1, sent_at = ?, last_error = NULL, {_SCRUB}"
+                " WHERE key = ?",
+                (SENT, time.time(), key)
+            )
+            self._conn.commit()
+            self.sent += 1
+
+    def mark_failed(self, key: str, attempts: int, error: Exception) -> bool:
+        """
+        Records a failed attempt and schedules a retry with backoff.
+
+        Args:
+            key: Message key
+            attempts: Attempts made before this one
+            error: The delivery error
+
+        Returns:
+            bool: True if the message will be retried
+        """
+        attempts += 1
+        retry = attempts < self.max_attempts
+        next_attempt = time.time() + self.retry_seconds * (2 ** (attempts - 1))
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?"
+                + ("" if retry else f", {_SCRUB}") + " WHERE key = ?",
+                (PENDING if retry else FAILED, attempts, next_attempt, str(error), key)
+            )
+            self._conn.commit()
+            if retry:
+                self.retries += 1
+            else:
+                self.failed += 1
+        return retry
+
+    def pending_count(self) -> int:
+        """
+        Returns: Number of messages still waiting for (re)delivery
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status IN (?, ?)", (PENDING, SENDING)
+            ).fetchone()[0]
+
+    def deliver(self, send: Callable[[str, str, str], None], done: Optional[threading.Event] = None,
+                poll_interval: float = 0.5):
+        """
+        Drains the outbox, retrying failures with backoff.
+
+        Returns once the outbox is empty and `done` is set (i.e. rendering
+        has finished), or immediately when empty if `done` is None.
+
+        Args:
+            send: Callable(sender, recipient, message) that raises on failure
+            done: Event set by the producer after the last enqueue
+            poll_interval: Seconds to wait when nothing is due yet
+        """
+        while True:
+            item = self.claim()
+            if item is None:
+                if (done is None or done.is_set()) and self.pending_count() == 0:
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            try:
+                send(item["sender"], item["recipient"], item["message"])
+            except Exception as e:
+                retry = self.mark_failed(item["key"], item["attempts"], e)
+                status = "will retry" if retry else "giving up"
+                print(f"❌ Delivery to {item['recipient']} failed "
+                      f"(attempt {item['attempts'] + 1}/{self.max_attempts}, {status}): {e}")
+                continue
+
+            self.mark_sent(item["key"])
+            print(f"✅ Sent email to {item['recipient']}")
+
+    def start_delivery(self, send: Callable[[str, str, str], None], workers: int = 1) -> "DeliveryWorkers":
+        """
+        Starts background delivery threads that overlap with rendering.
+
+        Args:
+            send: Callable(sender, recipient, message) that raises on failure
+            workers: Number of delivery threads
+
+        Returns:
+            DeliveryWorkers: Call finish() after the last enqueue
+        """
+        return DeliveryWorkers(self, send, workers)
+
+    def report(self):
+        """Prints a one-line summary of delivery for the run."""
+        print(f"📤 Outbox: {self.sent} delivered, {self.retries} retries, "
+              f"{self.failed} failed, {self.pending_count()} left for next run")
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class DeliveryWorkers:
+    """Background threads draining an Outbox while the producer renders."""
+
+    def __init__(self, outbox: Outbox, send: Callable[[str, str, str], None], workers: int = 1):
+        self.done = threading.Event()
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=outbox.deliver, args=(send, self.done), daemon=True)
+            for _ in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def finish(self):
+        """Signals that rendering is complete and waits for delivery to drain."""
+        self.done.set()
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,302 @@
+"""
+Battery Scout - Query Plan
+Compiles each topic once per run into immutable search specs (English plus
+translated searches) with pre-encoded Google News RSS URLs, so the
+per-subscriber loop only does dictionary lookups.
+"""
+
+import urllib.parse
+from typing import Dict, Iterable, Iterator, NamedTuple, Tuple
+
+from topic_query import TopicQuery, compile_query
+
+# --- MULTI-LANGUAGE MAPPING (English Topic -> Non-English Search Terms) ---
+# Key battery industry countries: China, Germany, Japan, South Korea, Hungary, Sweden, France, Spain
+MULTILANGUAGE_MAPPING = {
+    # NEW 10-CATEGORY STRUCTURE
+    # 🔋 Battery Technologies
+    "Next-Gen Batteries": {
+        "zh-CN": "固态电池 OR 钠离子电池 OR 下一代电池",
+        "de": "Festkörperbatterie OR Natrium-Ionen-Batterie OR Feststoffbatterie",
+        "ja": "全固体電池 OR ナトリウムイオン電池",
+        "ko": "전고체 배터리 OR 나트륨 이온 배터리",
+        "hu": "szilárdtest akkumulátor OR nátrium-ion akkumulátor",
+        "sv": "faststatusbatteri OR natriumjonbatteri",
+        "fr": "batterie solide OR batterie sodium-ion",
+        "es": "batería de estado sólido OR batería de ión sodio"
+    },
+    "Advanced Materials": {
+        "zh-CN": "硅负极 OR 锂金属负极 OR 磷酸铁锂 OR LMFP",
+        "de": "Silizium-Anode OR Lithium-Metall-Anode OR LFP Batterie",
+        "ja": "シリコン負極 OR リチウム金属負極 OR LFP電池",
+        "ko": "실리콘 음극 OR 리튬 금속 음극",
+        "hu": "szilícium anód OR lítium-fém anód",
+        "sv": "kiselaluminium anod OR litiummetall anod",
+        "fr": "anode silicium OR anode lithium métal OR LFP",
+        "es": "ánodo de silicio OR ánodo de litio metálico"
+    },
+    "Energy Storage Systems": {
+        "zh-CN": "储能电站 OR 工商业储能 OR 全钒液流电池",
+        "de": "Energiespeicher OR Batteriespeicher OR Vanadium-Redox-Flow-Batterie",
+        "ja": "蓄電システム OR バナジウムレドックスフロー電池",
+        "ko": "에너지 저장 시스템 OR 바나듐 레독스 플로우 배터리",
+        "hu": "energiatároló rendszer OR vanádium-redox áramlásos akkumulátor",
+        "sv": "energilagring OR vanadium-redox-flödesbatteri",
+        "fr": "stockage énergie OR batterie flux redox vanadium",
+        "es": "almacenamiento energía OR batería de flujo redox de vanadio"
+    },
+    "Battery Safety & Performance": {
+        "zh-CN": "电池 热失控 安全 OR 电池测试",
+        "de": "Batterie Sicherheit OR thermisches Durchgehen OR Batterietest",
+        "ja": "電池 安全性 OR 熱暴走",
+        "ko": "배터리 안전 OR 열폭주",
+        "hu": "akkumulátor biztonság OR hőrobbanás",
+        "sv": "batterisäkerhet OR termisk rusning",
+        "fr": "sécurité batterie OR emballement thermique",
+        "es": "seguridad batería OR fuga térmica"
+    },
+
+    # 🏛️ Policy & Markets
+    "US Policy & Incentives": {
+        "zh-CN": "IRA法案 电池 OR 通胀削减法案 电池 OR 美国 电池 补贴",
+        "de": "IRA Gesetz Batterie OR USA Batterieförderung",
+        "ja": "IRA法 バッテリー OR 米国 電池 補助金",
+        "ko": "IRA법 배터리 OR 미국 배터리 보조금",
+        "hu": "IRA törvény akkumulátor OR USA akkumulátor támogatás",
+        "sv": "IRA lag batteri OR USA batteristöd",
+        "fr": "loi IRA batterie OR subventions batteries USA",
+        "es": "ley IRA batería OR subsidios baterías EEUU"
+    },
+    "EU Regulations": {
+        "zh-CN": "电池护照 欧盟 OR 欧盟电池法规 OR CBAM 电池",
+        "de": "Batteriepass OR EU-Batterieverordnung OR CBAM Batterie",
+        "ja": "バッテリーパスポート OR EU電池規制",
+        "ko": "배터리 여권 OR EU 배터리 규정",
+        "hu": "akkumulátor útlevél OR EU akkumulátor szabályozás",
+        "sv": "batteripass OR EU batterireglering",
+        "fr": "passeport batterie OR réglementation UE batteries",
+        "es": "pasaporte batería OR regulación UE baterías"
+    },
+    "China Industry & Trade": {
+        "zh-CN": "电池 出口管制 商务部 OR 动力电池 产业政策",
+        "de": "China Batterie Exportkontrolle OR chinesische Batterieindustrie",
+        "ja": "中国 電池 輸出規制 OR 中国 電池産業",
+        "ko": "중국 배터리 수출 통제 OR 중국 배터리 산업",
+        "hu": "Kína akkumulátor exportellenőrzés",
+        "sv": "Kina batteri exportkontroll",
+        "fr": "Chine contrôle export batterie OR industrie batterie chinoise",
+        "es": "China control exportación batería OR industria batería china"
+    },
+
+    # ♻️ Supply Chain & Sustainability
+    "Critical Minerals & Mining": {
+        "zh-CN": "锂矿 开采 OR 关键矿产 电池 OR 钴矿 镍矿",
+        "de": "Lithiumabbau OR kritische Mineralien Batterie OR Kobalt Nickel",
+        "ja": "リチウム採掘 OR 重要鉱物 電池 OR コバルト ニッケル",
+        "ko": "리튬 채굴 OR 핵심 광물 배터리 OR 코발트 니켈",
+        "hu": "lítium bányászat OR kritikus ásványok akkumulátor",
+        "sv": "litiumutvinning OR kritiska mineraler batteri",
+        "fr": "extraction lithium OR minéraux critiques batterie OR cobalt nickel",
+        "es": "extracción litio OR minerales críticos batería OR cobalto níquel"
+    },
+    "Manufacturing & Gigafactories": {
+        "zh-CN": "动力电池 投产 OR 电池工厂 OR 电动汽车 供应链",
+        "de": "Gigafactory OR Batteriefabrik OR Elektroauto Lieferkette",
+        "ja": "ギガファクトリー OR 電池工場 OR 電気自動車 サプライチェーン",
+        "ko": "기가팩토리 OR 배터리 공장 OR 전기차 공급망",
+        "hu": "gigagyár OR akkumulátorgyár",
+        "sv": "gigafabrik OR batterifabrik",
+        "fr": "gigafactory OR usine batterie OR chaîne approvisionnement véhicule électrique",
+        "es": "gigafábrica OR fábrica baterías OR cadena suministro vehículo eléctrico"
+    },
+    "Recycling & Circular Economy": {
+        "zh-CN": "动力电池回收 OR 电池循环利用 OR 黑粉",
+        "de": "Batterierecycling OR Kreislaufwirtschaft Batterie OR Schwarzmasse",
+        "ja": "電池リサイクル OR 循環型経済 OR ブラックマス",
+        "ko": "배터리 재활용 OR 순환경제 OR 블랙매스",
+        "hu": "akkumulátor újrahasznosítás OR körforgásos gazdaság",
+        "sv": "batteriåtervinning OR cirkulär ekonomi",
+        "fr": "recyclage batterie OR économie circulaire OR masse noire",
+        "es": "reciclaje batería OR economía circular OR masa negra"
+    },
+
+    # LEGACY SUPPORT - Keep old categories for existing subscribers
+    "Solid State Batteries": {"zh-CN": "固态电池", "de": "Festkörperbatterie", "ja": "全固体電池"},
+    "Sodium-Ion": {"zh-CN": "钠离子电池", "de": "Natrium-Ionen-Batterie", "ja": "ナトリウムイオン電池"},
+    "Silicon Anode": {"zh-CN": "硅负极 电池", "de": "Silizium-Anode", "ja": "シリコン負極"},
+    "LFP Battery": {"zh-CN": "磷酸铁锂 电池", "de": "LFP Batterie", "ja": "LFP電池"},
+}
+
+# Language config: code, region, flag emoji
+LANGUAGES = [
+    ("en", "US", "🇺🇸"),
+    ("zh-CN", "CN", "🇨🇳"),
+    ("de", "DE", "🇩🇪"),
+    ("ja", "JP", "🇯🇵"),
+    ("ko", "KR", "🇰🇷"),
+    ("hu", "HU", "🇭🇺"),
+    ("sv", "SE", "🇸🇪"),
+    ("fr", "FR", "🇫🇷"),
+    ("es", "ES", "🇪🇸")
+]
+
+# Language code -> (region, flag), for O(1) lookups while compiling
+LANGUAGE_INDEX = {code: (region, flag) for code, region, flag in LANGUAGES}
+
+# Google News time window of the daily run
+SEARCH_WINDOW = "1d"
+
+
+class SearchSpec(NamedTuple):
+    """One Google News search for a topic (immutable)."""
+    lang: str  # "zh" from "zh-CN"
+    lang_code: str
+    term: str  # Simplified topic the search was built from
+    query: str
+    region: str
+    flag: str
+    is_translated: bool
+    url: str  # Pre-encoded RSS URL
+    matcher: TopicQuery  # Topic alternatives + this query's terms, for local matching and ranking
+
+
+class TopicPlan(NamedTuple):
+    """Compiled searches for one topic."""
+    topic: str
+    simple_topic: str
+    searches: Tuple[SearchSpec, ...]
+    matcher: TopicQuery  # Every alternative of the topic expression
+
+
+def simplify_topic(topic: str) -> str:
+    """
+    Display name of a topic: its first alternative.
+
+    '("silicon anode" OR "Si-anode")' -> 'silicon anode'
+
+    Args:
+        topic: Topic name or Boolean topic expression
+
+    Returns:
+        str: First term
+    """
+    return compile_query(topic).first_term
+
+
+def english_query(topic: str, keywords: Tuple[str, ...] = ("battery",)) -> str:
+    """
+    Google News query covering every alternative of a topic.
+
+    '("silicon anode" OR "Si-anode")' -> '("silicon anode" OR "Si-anode") battery'
+    '("sodium battery" OR "Na-ion")' -> '("sodium battery" OR "Na-ion") battery'
+
+    Args:
+        topic: Topic name or Boolean topic expression
+        keywords: " battery" is appended unless every term already contains one of these
+
+    Returns:
+        str: Search query
+    """
+    query = compile_query(topic)
+    if query.is_boolean:
+        base = "(" + " OR ".join(f'"{term}"' for term in query.terms) + ")"
+    else:
+        base = query.first_term
+    # One unqualified alternative ("Na-ion") would otherwise search far beyond batteries
+    if all(any(keyword in term.lower() for keyword in keywords) for term in query.terms):
+        return base
+    return f"{base} battery"
+
+
+def rss_url(query: str, region: str, lang_code: str, window: str = SEARCH_WINDOW) -> str:
+    """
+    Returns: Google News RSS search URL limited to the given time window
+    """
+    safe_query = urllib.parse.quote(query)
+    return f"https://news.google.com/rss/search?q={safe_query}+when:{window}&hl={lang_code}&gl={region}&ceid={region}:{lang_code}"
+
+
+def compile_topic(topic: str, window: str = SEARCH_WINDOW) -> TopicPlan:
+    """
+    Builds the searches (English + translated) for a topic.
+
+    Args:
+        topic: Topic name or legacy Boolean topic expression
+        window: Google News time window (e.g. "1d")
+
+    Returns:
+        TopicPlan: The compiled plan
+    """
+    simple_topic = simplify_topic(topic)
+
+    # Always add English search (all alternatives of a Boolean topic, not just the first)
+    eng_query = english_query(topic)
+    searches = [SearchSpec("en", "en-US", simple_topic, eng_query, "US", "🇺🇸", False,
+                           rss_url(eng_query, "US", "en-US", window), compile_query(topic, eng_query))]
+
+    # Add non-English searches if topic has translations
+    translations = MULTILANGUAGE_MAPPING.get(topic)
+    if isinstance(translations, dict):
+        for lang_code, translated_query in translations.items():
+            lang_info = LANGUAGE_INDEX.get(lang_code)
+            if lang_info:
+                region, flag = lang_info
+                searches.append(SearchSpec(lang_code.split('-')[0], lang_code, simple_topic, translated_query,
+                                           region, flag, True, rss_url(translated_query, region, lang_code, window),
+                                           compile_query(topic, translated_query)))
+
+    return TopicPlan(topic, simple_topic, tuple(searches), compile_query(topic))
+
+
+class QueryPlan:
+    """
+    Topic -> TopicPlan lookup table.
+
+    Every topic in MULTILANGUAGE_MAPPING is compiled up front; topics only
+    seen in the subscriber sheet (e.g. legacy Boolean expressions) are
+    compiled on first lookup and kept.
+    """
+
+    def __init__(self, topics: Iterable[str] = (), window: str = SEARCH_WINDOW):
+        """
+        Args:
+            topics: Extra topics to compile now, in addition to the mapped ones
+            window: Google News time window for every URL
+        """
+        self.window = window
+        self._plans: Dict[str, TopicPlan] = {}
+        self.compile(MULTILANGUAGE_MAPPING)
+        self.compile(topics)
+
+    def compile(self, topics: Iterable[str]):
+        """Compiles any topics not planned yet."""
+        for topic in topics:
+            if topic not in self._plans:
+                self._plans[topic] = compile_topic(topic, self.window)
+
+    def get(self, topic: str) -> TopicPlan:
+        """
+        Returns: The topic's compiled plan
+        """
+        plan = self._plans.get(topic)
+        if plan is None:
+            plan = self._plans[topic] = compile_topic(topic, self.window)
+        return plan
+
+    def searches(self, topic: str) -> Tuple[SearchSpec, ...]:
+        """
+        Returns: The topic's search specs
+        """
+        return self.get(topic).searches
+
+    def urls(self, topics: Iterable[str]) -> Iterator[str]:
+        """
+        Yields: Every RSS URL needed for the given topics
+        """
+        for topic in topics:
+            for search in self.searches(topic):
+                yield search.url
+
+
+# Shared plan for the daily run
+QUERY_PLAN = QueryPlan()
@@ -0,0 +1,125 @@
+"""
+Battery Scout - Relevance Ranking
+Cheap scoring of candidate articles so each search's top-k slots (and the
+AI summaries spent on them) go to the most relevant, freshest stories from
+the strongest sources, not to whichever entries come first in the feed.
+
+score = (1 + term relevance) x recency decay x source weight
+"""
+
+import heapq
+import math
+import time
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+from dedup import normalize_text
+from topic_query import TopicQuery
+
+T = TypeVar("T")
+
+# --- CONFIGURATION ---
+RECENCY_HALF_LIFE_HOURS = 12  # Score halves for every 12 hours of age
+UNDATED_RECENCY = 0.5
+TITLE_WEIGHT = 2.0  # A term in the title counts double
+SNIPPET_WEIGHT = 1.0
+
+# Source multipliers (matched case-insensitively against the feed's source name)
+SOURCE_WEIGHTS = {
+    "reuters": 1.3,
+    "bloomberg": 1.3,
+    "financial times": 1.25,
+    "nikkei": 1.2,
+    "electrek": 1.15,
+    "electrive": 1.15,
+    "energy-storage.news": 1.15,
+    "batteries news": 1.1,
+    "cnevpost": 1.1,
+    "techcrunch": 1.1,
+}
+UNKNOWN_SOURCE_WEIGHT = 0.8
+
+
+def term_relevance(title: str, snippet: str, query: TopicQuery) -> float:
+    """
+    Weighted hits of the topic's alternatives: multi-word terms are more
+    specific and weigh more.
+
+    Args:
+        title: Article title
+        snippet: Article snippet (HTML allowed)
+        query: Compiled topic expression (every OR alternative)
+
+    Returns:
+        float: Relevance (0.0 when no term appears)
+    """
+    title_hits = query.hits(title)
+    snippet_hits = query.hits(normalize_text(snippet)) - title_hits if snippet else frozenset()
+    relevance = 0.0
+    for hits, hit_weight in ((title_hits, TITLE_WEIGHT), (snippet_hits, SNIPPET_WEIGHT)):
+        for term in hits:
+            relevance += hit_weight * (1.0 + 0.5 * term.count(" "))
+    # Diminishing returns: many synonyms should not swamp recency
+    return math.log1p(relevance)
+
+
+def source_weight(source: str) -> float:
+    """
+    Returns: Multiplier for a source name (1.0 for unlisted sources)
+    """
+    if not source or source == "Unknown":
+        return UNKNOWN_SOURCE_WEIGHT
+    lowered = source.lower()
+    for name, weight in SOURCE_WEIGHTS.items():
+        if name in lowered:
+            return weight
+    return 1.0
+
+
+def recency(published: Optional[float], now: float) -> float:
+    """
+    Returns: Exponential decay factor in (0, 1] for an epoch publication time
+    """
+    if published is None:
+        return UNDATED_RECENCY
+    age_hours = max(0.0, now - published) / 3600
+    return 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS)
+
+
+def article_weight(title: str, snippet: str, source: str, query: TopicQuery) -> float:
+    """
+    The time-independent part of the score: (1 + term relevance) x source weight.
+
+    Returns:
+        float: Weight, to be multiplied by recency()
+    """
+    return (1.0 + term_relevance(title, snippet, query)) * source_weight(source)
+
+
+def score_article(title: str, snippet: str, source: str, published: Optional[float],
+                  query: TopicQuery, now: Optional[float] = None) -> float:
+    """
+    Scores one candidate article.
+
+    Args:
+        title: Article title
+        snippet: Article snippet
+        source: Publisher name
+        published: Publication time (epoch seconds) or None
+        query: Compiled topic expression
+        now: Reference time (defaults to time.time())
+
+    Returns:
+        float: Score (higher is better)
+    """
+    now = time.time() if now is None else now
+    return article_weight(title, snippet, source, query) * recency(published, now)
+
+
+def top_k(items: Iterable[T], k: int, key: Callable[[T], float]) -> List[T]:
+    """
+    Heap-based selection of the k best items (O(n log k), ties keep input order).
+
+    Returns:
+        list: Up to k items, best first
+    """
+    return heapq.nlargest(k, items, key=key)
@@ -0,0 +1,126 @@
+"""
+Battery Scout - Rate Limiting
+Token-bucket limiter and backoff helpers for quota-bound APIs (Gemini).
+"""
+
+import threading
+import time
+from typing import Any, Callable
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Checks whether an API error means the quota was exhausted.
+
+    Args:
+        error: Exception raised by the API client
+
+    Returns:
+        bool: True for HTTP 429 / RESOURCE_EXHAUSTED errors
+    """
+    error_str = str(error)
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket configured in requests per minute.
+
+    Callers block in acquire() only as long as needed for the next token,
+    so request latency overlaps with the quota window instead of adding a
+    fixed sleep before every call.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int = 1,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Any] = time.sleep):
+        """
+        Args:
+            requests_per_minute: Sustained request rate
+            burst: Maximum tokens that can accumulate while idle
+            clock: Monotonic clock (injectable for tests)
+            sleep: Sleep function (injectable for tests)
+        """
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """
+        Blocks until a token is available and consumes it.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    self.waited += waited
+                    return waited
+                delay = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            self._sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        """
+        Stops handing out tokens for a while (e.g. after a 429).
+
+        Args:
+            seconds: Pause length from now
+        """
+        with self._lock:
+            now = self._clock()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = now
+
+
+def call_with_backoff(func: Callable[[], Any], bucket: TokenBucket, max_retries: int = 3,
+                      base_delay: float = 10.0) -> Any:
+    """
+    Calls func under the rate limiter, retrying quota errors with backoff.
+
+    Each attempt takes a token. On a 429/RESOURCE_EXHAUSTED error the whole
+    bucket is paused for base_delay * 2**attempt seconds, so every worker
+    sharing the bucket backs off together.
+
+    Args:
+        func: Zero-argument callable performing the API request
+        bucket: Shared TokenBucket
+        max_retries: Retries after the first attempt
+        base_delay: First backoff delay in seconds
+
+    Returns:
+        Whatever func returns
+
+    Raises:
+        Exception: The last error if it is not a quota error or retries run out
+    """
+    attempt = 0
+    while True:
+        bucket.acquire()
+        try:
+            return func()
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt >= max_retries:
+                raise
+            delay = base_delay * (2 ** attempt)
+            print(f"⚠️  Rate limit hit. Backing off {delay:.0f}s (retry {attempt + 1}/{max_retries})...")
+            bucket.pause(delay)
+            attempt += 1
@@ -1,21 +1,34 @@
 import os
 import smtplib
-import ssl
 import json
-import feedparser
-import urllib.parse
 from google import genai
+import threading
+import functools
+import heapq
 import time
 import hashlib
 import base64
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from email.message import EmailMessage
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from dateutil import parser as date_parser
 import email_template
+from feeds import FeedCache, FeedStore
+from summary_cache import SummaryCache, summary_key
+from rate_limiter import TokenBucket, call_with_backoff, is_rate_limit_error
+from mailer import SMTPSender, SMTP_CONNECTIONS
+from outbox import Outbox, idempotency_key
+from sent_ledger import SentLedger
+from dedup import collapse_near_duplicates
+from article_pool import ArticlePool
+from subscriber_store import SheetSubscriberStore, sync_snapshot
+from query_plan import QUERY_PLAN
+from date_filter import run_cutoff, entry_timestamp, fresh_entries, parse_rfc822
+from ranking import article_weight, recency
+from metrics import RUN_METRICS
 
 # --- CONFIGURATION ---
 api_key = os.environ.get("GOOGLE_API_KEY")
@@ -27,150 +40,70 @@ gemini_key = os.environ.get("GEMINI_API_KEY")
 # ⚠️ PASTE YOUR SPREADSHEET ID HERE ⚠️
 SPREADSHEET_ID = '1jaE61a613sqmxQnT_UncrbHzAsqYPqDwdIZGqoJ5Lc8'
 RANGE_NAME = 'Sheet1!A:C'
+# Run from the local subscriber snapshot without reading the sheet (tests, outages)
+SUBSCRIBERS_OFFLINE = os.environ.get("SUBSCRIBERS_OFFLINE") == "1"
 
 # --- AI SETUP ---
 if gemini_key:
     client = genai.Client(api_key=gemini_key)
 
 # --- AI RATE LIMITING ---
-AI_CALL_DELAY = 6.5  # 6.5 seconds between calls (gemini-2.0-flash-exp: 10 requests/min max)
+AI_REQUESTS_PER_MINUTE = 9  # gemini-2.0-flash-exp: 10 requests/min max
+AI_WORKERS = 3  # Concurrent summarization workers sharing the rate limiter
+AI_MAX_RETRIES = 3  # Retries per article after a 429 / RESOURCE_EXHAUSTED
+AI_BACKOFF_SECONDS = 10  # First backoff delay, doubled on each retry
 ai_call_count = 0
 MAX_AI_CALLS_PER_RUN = 50  # Reduced limit to stay well under quota
-
-# --- MULTI-LANGUAGE MAPPING (English Topic -> Non-English Search Terms) ---
-# Key battery industry countries: China, Germany, Japan, South Korea, Hungary, Sweden, France, Spain
-MULTILANGUAGE_MAPPING = {
-    # NEW 10-CATEGORY STRUCTURE
-    # 🔋 Battery Technologies
-    "Next-Gen Batteries": {
-        "zh-CN": "固态电池 OR 钠离子电池 OR 下一代电池",
-        "de": "Festkörperbatterie OR Natrium-Ionen-Batterie OR Feststoffbatterie",
-        "ja": "全固体電池 OR ナトリウムイオン電池",
-        "ko": "전고체 배터리 OR 나트륨 이온 배터리",
-        "hu": "szilárdtest akkumulátor OR nátrium-ion akkumulátor",
-        "sv": "faststatusbatteri OR natriumjonbatteri",
-        "fr": "batterie solide OR batterie sodium-ion",
-        "es": "batería de estado sólido OR batería de ión sodio"
-    },
-    "Advanced Materials": {
-        "zh-CN": "硅负极 OR 锂金属负极 OR 磷酸铁锂 OR LMFP",
-        "de": "Silizium-Anode OR Lithium-Metall-Anode OR LFP Batterie",
-        "ja": "シリコン負極 OR リチウム金属負極 OR LFP電池",
-        "ko": "실리콘 음극 OR 리튬 금속 음극",
-        "hu": "szilícium anód OR lítium-fém anód",
-        "sv": "kiselaluminium anod OR litiummetall anod",
-        "fr": "anode silicium OR anode lithium métal OR LFP",
-        "es": "ánodo de silicio OR ánodo de litio metálico"
-    },
-    "Energy Storage Systems": {
-        "zh-CN": "储能电站 OR 工商业储能 OR 全钒液流电池",
-        "de": "Energiespeicher OR Batteriespeicher OR Vanadium-Redox-Flow-Batterie",
-        "ja": "蓄電システム OR バナジウムレドックスフロー電池",
-        "ko": "에너지 저장 시스템 OR 바나듐 레독스 플로우 배터리",
-        "hu": "energiatároló rendszer OR vanádium-redox áramlásos akkumulátor",
-        "sv": "energilagring OR vanadium-redox-flödesbatteri",
-        "fr": "stockage énergie OR batterie flux redox vanadium",
-        "es": "almacenamiento energía OR batería de flujo redox de vanadio"
-    },
-    "Battery Safety & Performance": {
-        "zh-CN": "电池 热失控 安全 OR 电池测试",
-        "de": "Batterie Sicherheit OR thermisches Durchgehen OR Batterietest",
-        "ja": "電池 安全性 OR 熱暴走",
-        "ko": "배터리 안전 OR 열폭주",
-        "hu": "akkumulátor biztonság OR hőrobbanás",
-        "sv": "batterisäkerhet OR termisk rusning",
-        "fr": "sécurité batterie OR emballement thermique",
-        "es": "seguridad batería OR fuga térmica"
-    },
-
-    # 🏛️ Policy & Markets
-    "US Policy & Incentives": {
-        "zh-CN": "IRA法案 电池 OR 通胀削减法案 电池 OR 美国 电池 补贴",
-        "de": "IRA Gesetz Batterie OR USA Batterieförderung",
-        "ja": "IRA法 バッテリー OR 米国 電池 補助金",
-        "ko": "IRA법 배터리 OR 미국 배터리 보조금",
-        "hu": "IRA törvény akkumulátor OR USA akkumulátor támogatás",
-        "sv": "IRA lag batteri OR USA batteristöd",
-        "fr": "loi IRA batterie OR subventions batteries USA",
-        "es": "ley IRA batería OR subsidios baterías EEUU"
-    },
-    "EU Regulations": {
-        "zh-CN": "电池护照 欧盟 OR 欧盟电池法规 OR CBAM 电池",
-        "de": "Batteriepass OR EU-Batterieverordnung OR CBAM Batterie",
-        "ja": "バッテリーパスポート OR EU電池規制",
-        "ko": "배터리 여권 OR EU 배터리 규정",
-        "hu": "akkumulátor útlevél OR EU akkumulátor szabályozás",
-        "sv": "batteripass OR EU batterireglering",
-        "fr": "passeport batterie OR réglementation UE batteries",
-        "es": "pasaporte batería OR regulación UE baterías"
-    },
-    "China Industry & Trade": {
-        "zh-CN": "电池 出口管制 商务部 OR 动力电池 产业政策",
-        "de": "China Batterie Exportkontrolle OR chinesische Batterieindustrie",
-        "ja": "中国 電池 輸出規制 OR 中国 電池産業",
-        "ko": "중국 배터리 수출 통제 OR 중국 배터리 산업",
-        "hu": "Kína akkumulátor exportellenőrzés",
-        "sv": "Kina batteri exportkontroll",
-        "fr": "Chine contrôle export batterie OR industrie batterie chinoise",
-        "es": "China control exportación batería OR industria batería china"
-    },
-
-    # ♻️ Supply Chain & Sustainability
-    "Critical Minerals & Mining": {
-        "zh-CN": "锂矿 开采 OR 关键矿产 电池 OR 钴矿 镍矿",
-        "de": "Lithiumabbau OR kritische Mineralien Batterie OR Kobalt Nickel",
-        "ja": "リチウム採掘 OR 重要鉱物 電池 OR コバルト ニッケル",
-        "ko": "리튬 채굴 OR 핵심 광물 배터리 OR 코발트 니켈",
-        "hu": "lítium bányászat OR kritikus ásványok akkumulátor",
-        "sv": "litiumutvinning OR kritiska mineraler batteri",
-        "fr": "extraction lithium OR minéraux critiques batterie OR cobalt nickel",
-        "es": "extracción litio OR minerales críticos batería OR cobalto níquel"
-    },
-    "Manufacturing & Gigafactories": {
-        "zh-CN": "动力电池 投产 OR 电池工厂 OR 电动汽车 供应链",
-        "de": "Gigafactory OR Batteriefabrik OR Elektroauto Lieferkette",
-        "ja": "ギガファクトリー OR 電池工場 OR 電気自動車 サプライチェーン",
-        "ko": "기가팩토리 OR 배터리 공장 OR 전기차 공급망",
-        "hu": "gigagyár OR akkumulátorgyár",
-        "sv": "gigafabrik OR batterifabrik",
-        "fr": "gigafactory OR usine batterie OR chaîne approvisionnement véhicule électrique",
-        "es": "gigafábrica OR fábrica baterías OR cadena suministro vehículo eléctrico"
-    },
-    "Recycling & Circular Economy": {
-        "zh-CN": "动力电池回收 OR 电池循环利用 OR 黑粉",
-        "de": "Batterierecycling OR Kreislaufwirtschaft Batterie OR Schwarzmasse",
-        "ja": "電池リサイクル OR 循環型経済 OR ブラックマス",
-        "ko": "배터리 재활용 OR 순환경제 OR 블랙매스",
-        "hu": "akkumulátor újrahasznosítás OR körforgásos gazdaság",
-        "sv": "batteriåtervinning OR cirkulär ekonomi",
-        "fr": "recyclage batterie OR économie circulaire OR masse noire",
-        "es": "reciclaje batería OR economía circular OR masa negra"
-    },
-
-    # LEGACY SUPPORT - Keep old categories for existing subscribers
-    "Solid State Batteries": {"zh-CN": "固态电池", "de": "Festkörperbatterie", "ja": "全固体電池"},
-    "Sodium-Ion": {"zh-CN": "钠离子电池", "de": "Natrium-Ionen-Batterie", "ja": "ナトリウムイオン電池"},
-    "Silicon Anode": {"zh-CN": "硅负极 电池", "de": "Silizium-Anode", "ja": "シリコン負極"},
-    "LFP Battery": {"zh-CN": "磷酸铁锂 电池", "de": "LFP Batterie", "ja": "LFP電池"},
+ai_rate_limiter = TokenBucket(AI_REQUESTS_PER_MINUTE)
+ai_call_lock = threading.Lock()
+
+# --- AI BATCHING ---
+# Articles packed into one Gemini call (1 disables batch mode)
+AI_BATCH_SIZE = int(os.environ.get("AI_BATCH_SIZE", 8))
+
+# --- WEEKLY DIGEST ---
+WEEKLY_DAYS = 7  # Daily pools merged into a weekly digest
+WEEKLY_PER_SEARCH = 4  # Max articles per language in a weekly digest
+WEEKLY_SUMMARY_BOOST = 100.0  # Outranks any relevance score, so summarized stories come first
+
+# Language names for better prompts
+LANG_NAMES = {
+    "zh": "Chinese",
+    "de": "German",
+    "ja": "Japanese",
+    "ko": "Korean",
+    "hu": "Hungarian",
+    "sv": "Swedish",
+    "fr": "French",
+    "es": "Spanish"
 }
 
-def get_subscribers_from_sheet():
+# --- AI SUMMARY CACHE (persists between runs) ---
+summary_cache = SummaryCache()
+
+@functools.lru_cache(maxsize=1)
+def sheets_service():
+    """Sheets v4 client, built once per run and shared by every page read"""
     creds = service_account.Credentials.from_service_account_info(
         service_account_info, scopes=['https://www.googleapis.com/auth/spreadsheets.readonly'])
-    service = build('sheets', 'v4', credentials=creds)
-    sheet = service.spreadsheets()
-    result = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=RANGE_NAME).execute()
+    return build('sheets', 'v4', credentials=creds).spreadsheets()
+
+def read_sheet_range(range_name):
+    """Cell values of an A1 range of the subscriber sheet (Sheets v4 API)"""
+    result = sheets_service().values().get(spreadsheetId=SPREADSHEET_ID, range=range_name).execute()
     return result.get('values', [])
 
-def is_article_new(published_date_str):
-    try:
-        pub_date = date_parser.parse(published_date_str).replace(tzinfo=None)
-        if (datetime.utcnow() - pub_date) < timedelta(hours=24):
-            return True
-        return False
-    except (ValueError, TypeError, AttributeError) as e:
-        print(f"Warning: Could not parse date '{published_date_str}': {e}")
-        return False
+@RUN_METRICS.timed("sheet.subscribers")
+def get_subscribers_from_sheet():
+    """
+    Local indexed subscriber snapshot, synced one-way from the sheet.
+
+    The sheet is read in SUBSCRIBER_PAGE_SIZE-row windows, so memory and
+    request size stay flat however long the subscriber list grows. The sync
+    reads every page before returning: the run needs every subscriber's
+    topics before it can decide which feeds to fetch.
+    """
+    return sync_snapshot(SheetSubscriberStore(read_sheet_range, RANGE_NAME), offline=SUBSCRIBERS_OFFLINE)
 
 def generate_unsubscribe_token(email):
     """Create secure unsubscribe token"""
@@ -179,6 +112,7 @@ def generate_unsubscribe_token(email):
     email_encoded = base64.urlsafe_b64encode(email.encode()).decode()
     return f"{email_encoded}.{token}"
 
+@RUN_METRICS.timed("ai.summarize")
 def ai_summarize_article(title, snippet="", is_translated=False, flag="", lang_code="en"):
     """
     Universal AI summarizer for all articles using Gemini 2.5
@@ -192,40 +126,17 @@ def ai_summarize_article(title, snippet="", is_translated=False, flag="", lang_c
 
     Returns: 1-sentence summary with flag prefix for translated content
     """
-    global ai_call_count
-
-    if not gemini_key:
-        return ""
+    cache_key, resolved = precheck_summary(title, snippet, is_translated, lang_code)
+    if resolved is not None:
+        return resolved
 
-    # Skip AI if snippet is too short (likely won't add value) for English articles
-    if not is_translated and len(snippet.strip()) < 50:
-        print(f"   ⏭️  Skipping AI (snippet too short): {len(snippet)} chars")
-        return ""
-
-    if ai_call_count >= MAX_AI_CALLS_PER_RUN:
-        print(f"⚠️  AI call limit reached ({MAX_AI_CALLS_PER_RUN}).")
+    call_number = reserve_ai_call()
+    if call_number is None:
         return ""
 
     try:
-        # Rate limiting delay
-        if ai_call_count > 0:
-            time.sleep(AI_CALL_DELAY)
-
-        ai_call_count += 1
-
         if is_translated:
-            # Language names for better prompts
-            lang_names = {
-                "zh": "Chinese",
-                "de": "German",
-                "ja": "Japanese",
-                "ko": "Korean",
-                "hu": "Hungarian",
-                "sv": "Swedish",
-                "fr": "French",
-                "es": "Spanish"
-            }
-            lang_name = lang_names.get(lang_code, "foreign language")
+            lang_name = LANG_NAMES.get(lang_code, "foreign language")
 
             prompt = f"""
             Translate and summarize this {lang_name} battery industry news in ONE clear sentence.
@@ -258,193 +169,620 @@ def ai_summarize_article(title, snippet="", is_translated=False, flag="", lang_c
             Bad: "Company announces battery technology partnership" (too vague)
             """
 
-        response = client.models.generate_content(
-            model='gemini-2.0-flash-exp',
-            contents=prompt
+        # Token bucket paces calls; 429s back off and retry instead of failing
+        response = call_with_backoff(
+            lambda: client.models.generate_content(
+                model='gemini-2.0-flash-exp',
+                contents=prompt
+            ),
+            ai_rate_limiter,
+            max_retries=AI_MAX_RETRIES,
+            base_delay=AI_BACKOFF_SECONDS
         )
         summary = response.text.strip()
 
         # Skip if AI determines no value
         if summary == "SKIP" or "Details not available" in summary:
             print(f"   ⏭️  AI determined no additional value")
+            summary_cache.set(cache_key, "")
             return ""
 
-        print(f"   🤖 AI Summary ({ai_call_count}/{MAX_AI_CALLS_PER_RUN}): {summary[:60]}...")
+        print(f"   🤖 AI Summary ({call_number}/{MAX_AI_CALLS_PER_RUN}): {summary[:60]}...")
+        summary_cache.set(cache_key, summary)
         return summary
 
     except Exception as e:
-        error_str = str(e)
-        # Check if it's a rate limit error
-        if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
-            print(f"⚠️  Rate limit hit. Skipping remaining AI calls for this run.")
-            # Set count to max to stop further API calls
-            ai_call_count = MAX_AI_CALLS_PER_RUN
+        if is_rate_limit_error(e):
+            stop_ai_calls()
         else:
             print(f"⚠️  AI Error: {e}")
         return ""
 
+def precheck_summary(title, snippet, is_translated, lang_code):
+    """
+    Resolve an article without calling Gemini when possible
+
+    Returns: (cache_key, summary) where summary is None if an AI call is needed
+    """
+    if not gemini_key:
+        return None, ""
+
+    # Skip AI if snippet is too short (likely won't add value) for English articles
+    if not is_translated and len(snippet.strip()) < 50:
+        print(f"   ⏭️  Skipping AI (snippet too short): {len(snippet)} chars")
+        return None, ""
+
+    cache_key = summary_key(title, snippet, lang_code)
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        print(f"   💾 Cached summary: {cached[:60] or 'SKIP'}...")
+    return cache_key, cached
+
+def reserve_ai_call():
+    """Reserve a slot in the run budget (shared by all workers); None if exhausted"""
+    global ai_call_count
+    with ai_call_lock:
+        if ai_call_count >= MAX_AI_CALLS_PER_RUN:
+            print(f"⚠️  AI call limit reached ({MAX_AI_CALLS_PER_RUN}).")
+            return None
+        ai_call_count += 1
+        return ai_call_count
+
+def stop_ai_calls():
+    """Quota still exhausted after all retries: stop further API calls"""
+    global ai_call_count
+    print(f"⚠️  Rate limit persists after {AI_MAX_RETRIES} retries. Skipping remaining AI calls for this run.")
+    with ai_call_lock:
+        ai_call_count = MAX_AI_CALLS_PER_RUN
+
+def build_batch_prompt(articles):
+    """
+    Pack several articles into one structured summarization prompt
+
+    Args:
+        articles: Article dicts (raw_title, snippet, is_translated, flag, lang)
+
+    Returns: Prompt asking for a JSON array with one summary per article id
+    """
+    items = []
+    for i, article in enumerate(articles):
+        items.append({
+            "id": i,
+            "language": LANG_NAMES.get(article["lang"], "English") if article["is_translated"] else "English",
+            "flag": article["flag"] if article["is_translated"] else "",
+            "title": article["raw_title"],
+            "snippet": article["snippet"]
+        })
+
+    return f"""
+    You are summarizing battery industry news. For EACH article below write ONE clear sentence.
+
+    Articles (JSON):
+    {json.dumps(items, ensure_ascii=False)}
+
+    Instructions for English articles:
+    - Extract KEY FACTS not in the title (numbers, specs, implications)
+    - Focus on business impact or technical details
+    - If the snippet adds NO new information beyond the title, use exactly: "SKIP"
+
+    Instructions for non-English articles:
+    - Translate and summarize; start with "<flag> <language> Update:"
+    - Focus on WHO is doing WHAT and WHY it matters
+    - Include specific details (numbers, locations, companies)
+
+    Respond with ONLY a JSON array, one object per article, in any order:
+    [{{"id": 0, "summary": "..."}}, {{"id": 1, "summary": "SKIP"}}]
+    """
+
+def parse_batch_response(text, count):
+    """
+    Parse a batch response into per-article summaries
+
+    Args:
+        text: Raw model output (may be wrapped in a ```json fence)
+        count: Number of articles in the batch
+
+    Returns: Dict of id -> summary, or None if the output is not usable
+    """
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end <= start:
+        return None
+    try:
+        items = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(items, list):
+        return None
+
+    summaries = {}
+    for item in items:
+        if not isinstance(item, dict): continue
+        item_id, summary = item.get("id"), item.get("summary")
+        if isinstance(item_id, int) and 0 <= item_id < count and isinstance(summary, str):
+            summaries[item_id] = summary.strip()
+    return summaries or None
+
+@RUN_METRICS.timed("ai.summarize_batch")
+def ai_summarize_batch(articles):
+    """
+    Summarize several articles with a single Gemini call
+
+    Cached and too-short articles are resolved first. Articles missing from
+    an unparseable or partial response fall back to one call each.
+
+    Args:
+        articles: Article dicts; their "summary" field is filled in
+    """
+    pending = []
+    for article in articles:
+        cache_key, resolved = precheck_summary(
+            article["raw_title"], article["snippet"], article["is_translated"], article["lang"])
+        if resolved is not None:
+            article["summary"] = resolved
+        else:
+            pending.append((article, cache_key))
+
+    if len(pending) <= 1:
+        for article, _ in pending:
+            summarize_article(article)
+        return
+
+    call_number = reserve_ai_call()
+    if call_number is None:
+        for article, _ in pending:
+            article["summary"] = ""
+        return
+
+    batch = [article for article, _ in pending]
+    summaries = None
+    try:
+        response = call_with_backoff(
+            lambda: client.models.generate_content(
+                model='gemini-2.0-flash-exp',
+                contents=build_batch_prompt(batch)
+            ),
+            ai_rate_limiter,
+            max_retries=AI_MAX_RETRIES,
+            base_delay=AI_BACKOFF_SECONDS
+        )
+        summaries = parse_batch_response(response.text, len(batch))
+        if summaries is None:
+            print(f"⚠️  Could not parse batch response; falling back to single calls")
+    except Exception as e:
+        if is_rate_limit_error(e):
+            stop_ai_calls()
+            for article in batch:
+                article["summary"] = ""
+            return
+        print(f"⚠️  AI Batch Error: {e}")
+
+    print(f"   🤖 AI Batch ({call_number}/{MAX_AI_CALLS_PER_RUN}): {len(summaries or {})}/{len(batch)} summaries")
+    for i, (article, cache_key) in enumerate(pending):
+        if summaries is None or i not in summaries:
+            summarize_article(article)
+            continue
+        summary = summaries[i]
+        # Skip if AI determines no value
+        if summary == "SKIP" or "Details not available" in summary:
+            summary = ""
+        summary_cache.set(cache_key, summary)
+        article["summary"] = summary
+
+def collect_topic_articles(topic, feed_cache, cutoff):
+    """
+    Phase 1: gather the fresh articles for a topic, once per run
+
+    Results depend only on the topic (and its languages), so they are shared
+    by every subscriber of that topic.
+
+    Args:
+        topic: Topic name or legacy Boolean topic expression
+        feed_cache: FeedCache holding this run's feeds
+        cutoff: Freshness cutoff (epoch seconds), computed once per run
+
+    Returns: List of article lists, one per search, in feed order, each
+    article carrying a relevance "score" for selection
+    """
+    groups = []
+    now = time.time()
+    for search in QUERY_PLAN.searches(topic):
+        feed = feed_cache.get(search.url)
+
+        articles = []
+        for entry in fresh_entries(feed.entries, cutoff):
+            # Extract source from feed
+            source = "Unknown"
+            if hasattr(entry, 'source') and 'title' in entry.source:
+                source = entry.source['title']
+
+            # Clean title: Remove " - Source Name" suffix from Google News titles
+            clean_title = entry.title
+            if " - " in clean_title:
+                # Google News format: "Article Title - Source Name"
+                clean_title = clean_title.rsplit(" - ", 1)[0]
+
+            snippet = entry.summary if hasattr(entry, 'summary') else ""
+            weight = article_weight(clean_title, snippet, source, search.matcher)
+            articles.append({
+                "raw_title": entry.title,
+                "title": clean_title,
+                "dedup_title": entry.title.split(" - ")[0].strip().lower(),
+                "link": entry.link,
+                "published": entry.published,
+                "source": source,
+                "snippet": snippet,
+                "is_translated": search.is_translated,
+                "flag": search.flag,
+                "lang": search.lang,
+                "score": weight * recency(entry_timestamp(entry), now),
+                "weight": weight,  # Recency-free part, so the weekly digest can re-age pooled stories
+                "summary": None  # Filled lazily by summarize_article()
+            })
+        groups.append(articles)
+    return groups
+
+def collapse_topic_duplicates(topic_articles):
+    """
+    Replace near-duplicate articles in every topic pool with one representative
+
+    The representative is the same dict everywhere it appears, so it is
+    summarized once and per-subscriber link dedup drops the other copies.
+
+    Args:
+        topic_articles: Topic -> article groups; rewritten in place
+    """
+    pool = []
+    pooled = set()
+    for groups in topic_articles.values():
+        for articles in groups:
+            for article in articles:
+                if id(article) not in pooled:
+                    pooled.add(id(article))
+                    pool.append(article)
+    if not pool:
+        return
+
+    representatives = collapse_near_duplicates(pool)
+    for groups in topic_articles.values():
+        for index, articles in enumerate(groups):
+            kept, kept_ids = [], set()
+            for article in articles:
+                representative = representatives[id(article)]
+                if id(representative) not in kept_ids:
+                    kept_ids.add(id(representative))
+                    kept.append(representative)
+            groups[index] = kept
+
+    clusters = len({id(r) for r in representatives.values()})
+    print(f"🧬 Near-duplicates: {len(pool)} articles collapsed into {clusters} stories")
+
+def article_score(article):
+    """Selection rank of an article: its relevance score"""
+    return article.get("score", 0.0)
+
+def weekly_rank(article, now):
+    """
+    Weekly selection rank: stories summarized during the week first, then by score
+
+    A pooled score aged only to the day it was collected, so recency is
+    recomputed from the publication date for the Monday selection.
+    """
+    weight = article.get("weight")
+    if weight is None:  # Pools written before weights were stored
+        score = article_score(article)
+    else:
+        score = weight * recency(parse_rfc822(article.get("published") or ""), now)
+    return score + (WEEKLY_SUMMARY_BOOST if article.get("summary") else 0.0)
+
+def select_articles(topic_list, topic_articles, per_search=2, already_sent=frozenset(), rank=article_score):
+    """
+    Phase 2: pick one subscriber's articles from the shared topic pools
+
+    Args:
+        topic_list: The subscriber's topics
+        topic_articles: Topic -> article groups from collect_topic_articles()
+        per_search: Max articles per language search
+        already_sent: Links/titles delivered to this subscriber in earlier runs
+        rank: Key ordering candidates (highest first)
+
+    Returns: List of (topic, articles) tuples for topics with articles
+    """
+    # TRACKING SETS (Reset per user, seeded with what earlier runs sent)
+    seen_urls = set(already_sent)
+    seen_titles = set(already_sent)
+
+    selected = []
+    for topic in topic_list:
+        if not topic: continue
+
+        picked = []
+        for articles in topic_articles.get(topic, []):
+            # Heap-based top-k: only the best candidates are ever popped
+            heap = [(-rank(article), i, article) for i, article in enumerate(articles)]
+            heapq.heapify(heap)
+            article_count = 0
+            while heap and article_count < per_search:  # Max 2 articles per language (more languages now)
+                _, _, article = heapq.heappop(heap)
+
+                # --- DUPLICATE CHECKER ---
+                if article["link"] in seen_urls or article["dedup_title"] in seen_titles:
+                    continue
+                seen_urls.add(article["link"])
+                seen_titles.add(article["dedup_title"])
+
+                picked.append(article)
+                article_count += 1
+
+        if picked:
+            selected.append((topic, picked))
+    return selected
+
+def select_for_subscriber(user_email, raw_topics, topic_articles, sent_ledger, per_search=2, rank=article_score):
+    """
+    Pick a subscriber's articles, skipping what earlier runs already sent them
+
+    The whole candidate set is checked against the sent ledger in one bulk
+    lookup; the selection is buffered in the ledger (and forgotten again if
+    its digest is not queued).
+
+    Returns: List of (topic, articles) tuples
+    """
+    topic_list = raw_topics.split("|")
+    candidate_ids = {
+        article_id
+        for topic in topic_list
+        for articles in topic_articles.get(topic, [])
+        for article in articles
+        for article_id in (article["link"], article["dedup_title"])
+    }
+    already_sent = sent_ledger.already_sent(user_email, candidate_ids)
+    selected = select_articles(topic_list, topic_articles, per_search=per_search, already_sent=already_sent,
+                               rank=rank)
+    sent_ledger.record(user_email, ledger_ids(selected))
+    return selected
+
+def settle_sent_ledger(sent_ledger, outbox, queued_digests):
+    """
+    Keep only delivered digests in the sent ledger
+
+    Articles of digests that failed (or are still waiting for a retry) are
+    dropped from the ledger, so a later run can select them again.
+
+    Args:
+        sent_ledger: Ledger holding this run's selections
+        outbox: Outbox the digests were queued in
+        queued_digests: Idempotency key -> (email, ledger ids) of each queued digest
+    """
+    delivered = outbox.sent_keys(queued_digests)
+    for key, (user_email, article_ids) in queued_digests.items():
+        if key not in delivered:
+            sent_ledger.forget(user_email, article_ids)
+    # Re-record delivered digests whose ids another subscriber row shared
+    for key in delivered:
+        sent_ledger.record(*queued_digests[key])
+    sent_ledger.close()
+
+def ledger_ids(selected):
+    """Sent-ledger ids (link and normalized title) of a subscriber's selection"""
+    return [
+        article_id
+        for _, articles in selected
+        for article in articles
+        for article_id in (article["link"], article["dedup_title"])
+    ]
+
+def fill_cached_summaries(articles):
+    """Give pooled articles without a summary the cached one, if any - never calls Gemini"""
+    for article in articles:
+        if article.get("summary") is None:
+            article["summary"] = summary_cache.get(
+                summary_key(article["raw_title"], article["snippet"], article["lang"]))
+
+def summarize_article(article):
+    """AI summary for an article, computed at most once per run"""
+    if article["summary"] is None:
+        article["summary"] = ai_summarize_article(
+            article["raw_title"], article["snippet"], article["is_translated"], article["flag"], article["lang"])
+    return article["summary"]
+
+def summarize_articles(articles, workers=AI_WORKERS, batch_size=AI_BATCH_SIZE):
+    """
+    Drain a queue of summarization jobs with a small worker pool
+
+    The shared token bucket keeps the pool within the Gemini quota, so
+    workers only wait when the quota actually requires it. With
+    batch_size > 1 each job packs several articles into one call.
+
+    Args:
+        articles: Articles needing a summary (duplicates are skipped)
+        workers: Number of concurrent workers
+        batch_size: Articles per Gemini call
+    """
+    pending = []
+    queued = set()
+    for article in articles:
+        if article["summary"] is None and id(article) not in queued:
+            queued.add(id(article))
+            pending.append(article)
+
+    if not pending:
+        return
+
+    print(f"🤖 Summarizing {len(pending)} articles ({workers} workers, {AI_REQUESTS_PER_MINUTE} req/min)...")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        if batch_size > 1:
+            batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+            list(pool.map(ai_summarize_batch, batches))
+        else:
+            list(pool.map(summarize_article, pending))
+
 def send_email():
     if not email_sender or not email_password:
         print("Error: Secrets not found.")
         return
 
     try:
-        rows = get_subscribers_from_sheet()
+        subscriber_store = get_subscribers_from_sheet()
     except Exception as e:
         print(f"Failed to read Sheet: {e}")
+        RUN_METRICS.incr("sheet.errors")
+        RUN_METRICS.write_report()
         return
 
-    subscribers = rows[1:]
-
     # Check if today is Monday (0 = Monday in Python's weekday())
     is_monday = datetime.now().weekday() == 0
 
-    for row in subscribers:
-        if len(row) < 2: continue
-        user_email = row[0]
-        raw_topics = row[1]
-        # Get frequency preference (default to "Daily" for backward compatibility)
-        frequency = row[2] if len(row) > 2 else "Daily"
+    active_subscribers = []
+    pooled_topics = set()  # Collected every day, including weekly-only topics
+    for subscriber in subscriber_store.iter_subscribers():
+        user_email, raw_topics, frequency = subscriber.email, subscriber.topics, subscriber.frequency
 
-        if not user_email or "@" not in user_email: continue
+        pooled_topics.update(subscriber.topic_list)
 
         # Skip weekly subscribers on non-Monday days
         if frequency == "Weekly" and not is_monday:
             print(f"⏭️  Skipping {user_email} (weekly subscriber, not Monday)")
             continue
 
-        print(f"🔎 Scouting news for: {user_email} ({frequency})")
-
-        # Use new email template
-        email_body_html = email_template.get_email_header()
-
-        news_found_count = 0
-        topic_list = raw_topics.split("|")
-        topics_with_articles = []  # Track which topics have articles for subject line
-
-        # TRACKING SETS (Reset per user)
-        seen_urls = set()
-        seen_titles = set()
-
-        # Language config: code, region, flag emoji
-        LANGUAGES = [
-            ("en", "US", "🇺🇸"),
-            ("zh-CN", "CN", "🇨🇳"),
-            ("de", "DE", "🇩🇪"),
-            ("ja", "JP", "🇯🇵"),
-            ("ko", "KR", "🇰🇷"),
-            ("hu", "HU", "🇭🇺"),
-            ("sv", "SE", "🇸🇪"),
-            ("fr", "FR", "🇫🇷"),
-            ("es", "ES", "🇪🇸")
+        active_subscribers.append((user_email, raw_topics, frequency))
+    subscriber_store.close()
+
+    # Identical topic/language queries are shared across subscribers, so
+    # collect every distinct feed for the run and download them concurrently
+    # Feeds unchanged since the last run come back as 304 and are served from disk
+    feed_store = FeedStore()
+    feed_cache = FeedCache(feed_store.fetch)
+    with RUN_METRICS.span("stage.fetch"):
+        QUERY_PLAN.compile(pooled_topics)
+        feed_cache.prefetch(QUERY_PLAN.urls(pooled_topics))
+
+    # PHASE 1: collect each distinct topic once (fetch + date filter)
+    with RUN_METRICS.span("stage.collect"):
+        cutoff = run_cutoff()
+        topic_articles = {topic: collect_topic_articles(topic, feed_cache, cutoff) for topic in sorted(pooled_topics)}
+
+    # Collapse syndicated copies and translated coverage of the same story
+    # to one representative before any AI call is spent on them
+    with RUN_METRICS.span("stage.dedup"):
+        collapse_topic_duplicates(topic_articles)
+
+    # A rerun on the same day skips subscribers whose digest is already in
+    # the outbox, before any selection or AI call is spent on them
+    outbox = Outbox()
+    run_date = datetime.now().strftime("%Y-%m-%d")
+    queued = {
+        subscriber for subscriber in active_subscribers
+        if outbox.is_queued(idempotency_key(run_date, *subscriber))
+    }
+    for user_email, _, _ in queued:
+        print(f"⏭️  Digest for {user_email} already queued today")
+    active_subscribers = [subscriber for subscriber in active_subscribers if subscriber not in queued]
+
+    # PHASE 2: cheap per-subscriber fan-out (pick + dedupe), dropping
+    # anything a subscriber already received in an earlier run
+    sent_ledger = SentLedger()
+    with RUN_METRICS.span("stage.select"):
+        selections = [
+            (user_email, raw_topics, frequency,
+             select_for_subscriber(user_email, raw_topics, topic_articles, sent_ledger))
+            for user_email, raw_topics, frequency in active_subscribers
+            if frequency != "Weekly"
         ]
 
-        for topic in topic_list:
-            if not topic: continue
+    # PHASE 3: summarize every selected article once, concurrently
+    with RUN_METRICS.span("stage.summarize"):
+        summarize_articles(
+            article
+            for _, _, _, selected in selections
+            for _, articles in selected
+            for article in articles
+        )
 
-            # 1. SETUP SEARCHES (English + Multiple Languages)
-            searches = []
+    # Persist today's (now summarized) pool for the weekly digest
+    article_pool = ArticlePool()
+    today = datetime.now().date()
+    article_pool.save(today, topic_articles)
+
+    # WEEKLY: on Mondays, build weekly digests from the last 7 daily pools
+    # (no extra feed fetches; only selected stories without a summary - e.g.
+    # topics no daily subscriber follows - are sent to Gemini, within the run budget)
+    weekly_subscribers = [s for s in active_subscribers if s[2] == "Weekly"]
+    if weekly_subscribers:
+        with RUN_METRICS.span("stage.weekly"):
+            weekly_articles = article_pool.load_week(today, pooled_topics, days=WEEKLY_DAYS)
+            collapse_topic_duplicates(weekly_articles)
+            fill_cached_summaries(
+                article
+                for groups in weekly_articles.values()
+                for articles in groups
+                for article in articles
+            )
+            week_now = time.time()
+            selections.extend(
+                (user_email, raw_topics, frequency,
+                 select_for_subscriber(user_email, raw_topics, weekly_articles, sent_ledger,
+                                       per_search=WEEKLY_PER_SEARCH,
+                                       rank=functools.partial(weekly_rank, now=week_now)))
+                for user_email, raw_topics, frequency in weekly_subscribers
+            )
+            summarize_articles(
+                article
+                for _, _, frequency, selected in selections
+                if frequency == "Weekly"
+                for _, articles in selected
+                for article in articles
+            )
+
+    # PHASE 4: render into the outbox while delivery drains it in the background
+    mailer = SMTPSender('smtp.gmail.com', 465, email_sender, email_password, security="ssl")
+
+    def deliver_message(sender, recipient, message):
+        try:
+            with RUN_METRICS.span("smtp.send"):
+                mailer.send(sender, recipient, message)
+        except smtplib.SMTPAuthenticationError:
+            print(f"   Check EMAIL_ADDRESS and EMAIL_PASSWORD environment variables")
+            raise
+
+    delivery = outbox.start_delivery(deliver_message, workers=SMTP_CONNECTIONS)
+
+    # Topic sections depend only on their articles: render each once, splice per subscriber
+    section_cache = email_template.SectionCache()
+    queued_digests = {}  # Key -> (email, ledger ids), recorded in the ledger once delivered
+
+    for user_email, raw_topics, frequency, selected in selections:
+        print(f"🔎 Scouting news for: {user_email} ({frequency})")
+        render_start = time.perf_counter()
 
-            simple_topic = topic.replace('(', '').replace(')', '').split(' OR ')[0].replace('"', '')
+        # Use new email template (HTML + plain text assembled in one pass)
+        if frequency == "Weekly":
+            digest = email_template.DigestBuilder(intro="Here are your personalized updates from the past week:")
+        else:
+            digest = email_template.DigestBuilder()
 
-            # Always add English search
-            eng_query = simple_topic if "battery" in simple_topic.lower() else f"{simple_topic} battery"
-            searches.append({
-                "lang": "en",
-                "lang_code": "en-US",
-                "term": simple_topic,
-                "query": eng_query,
-                "region": "US",
-                "flag": "🇺🇸",
-                "is_translated": False
-            })
+        news_found_count = 0
+        topics_with_articles = []  # Track which topics have articles for subject line
 
-            # Add non-English searches if topic has translations
-            if topic in MULTILANGUAGE_MAPPING and isinstance(MULTILANGUAGE_MAPPING[topic], dict):
-                for lang_code, translated_query in MULTILANGUAGE_MAPPING[topic].items():
-                    # Find matching language config
-                    lang_info = next((l for l in LANGUAGES if l[0] == lang_code), None)
-                    if lang_info:
-                        searches.append({
-                            "lang": lang_code.split('-')[0],  # "zh" from "zh-CN"
-                            "lang_code": lang_code,
-                            "term": simple_topic,
-                            "query": translated_query,
-                            "region": lang_info[1],
-                            "flag": lang_info[2],
-                            "is_translated": True
-                        })
-
-            topic_header_added = False
-            topic_article_count = 0
-
-            for search in searches:
-                safe_query = urllib.parse.quote(search["query"])
-                gl = search["region"]
-                hl = search["lang_code"]
-
-                rss_url = f"https://news.google.com/rss/search?q={safe_query}+when:1d&hl={hl}&gl={gl}&ceid={gl}:{hl}"
-                feed = feedparser.parse(rss_url)
-
-                article_count = 0
-
-                for entry in feed.entries:
-                    if article_count >= 2: break  # Max 2 articles per language (more languages now)
-                    if not is_article_new(entry.published): continue
-
-                    # --- DUPLICATE CHECKER ---
-                    clean_title = entry.title.split(" - ")[0].strip().lower()
-                    if entry.link in seen_urls or clean_title in seen_titles:
-                        continue
-
-                    seen_urls.add(entry.link)
-                    seen_titles.add(clean_title)
-                    # -----------------------------------
-
-                    # Add topic header if first article for this topic
-                    if not topic_header_added:
-                        # We'll add it after we know there are articles
-                        topic_header_added = True
-
-                    # PROCESS ARTICLE WITH AI
-                    is_translated = search["is_translated"]
-                    snippet = entry.summary if hasattr(entry, 'summary') else ""
-
-                    # Get AI summary for translated articles (non-English)
-                    ai_summary = ai_summarize_article(entry.title, snippet, is_translated, search["flag"], search["lang"])
-
-                    # Extract source from feed
-                    source = "Unknown"
-                    if hasattr(entry, 'source') and 'title' in entry.source:
-                        source = entry.source['title']
-
-                    # Clean title: Remove " - Source Name" suffix from Google News titles
-                    clean_title = entry.title
-                    if " - " in clean_title:
-                        # Google News format: "Article Title - Source Name"
-                        clean_title = clean_title.rsplit(" - ", 1)[0]
-
-                    # Add topic section header before first article
-                    if topic_article_count == 0:
-                        email_body_html += email_template.get_topic_section_header(topic)
-
-                    # Add article card
-                    email_body_html += email_template.get_article_card(
-                        title=clean_title,
-                        link=entry.link,
-                        date=entry.published,
-                        source=source,
-                        summary=ai_summary,
-                        is_chinese=is_translated  # True for any non-English article
-                    )
-
-                    news_found_count += 1
-                    article_count += 1
-                    topic_article_count += 1
+        for topic, articles in selected:
+            # Topic section header + article cards, rendered once per distinct article set
+            section_key = (topic, tuple(article["link"] for article in articles))
+            with RUN_METRICS.span("render.section"):
+                section = section_cache.get(section_key, topic, lambda: [
+                    {
+                        "title": article["title"],
+                        "link": article["link"],
+                        "date": article["published"],
+                        "source": article["source"],
+                        "summary": summarize_article(article),
+                        "is_chinese": article["is_translated"]  # True for any non-English article
+                    }
+                    for article in articles
+                ])
+            digest.add_section(section)
+            news_found_count += len(articles)
 
             # Track topics that had articles for subject line
-            if topic_article_count > 0:
-                topics_with_articles.append(topic)
+            topics_with_articles.append(topic)
 
         print(f"📊 Total news found: {news_found_count}")
 
@@ -453,7 +791,7 @@ def send_email():
             # Generate unsubscribe token and add footer
             unsubscribe_token = generate_unsubscribe_token(user_email)
             unsubscribe_url = f"https://battery-scout.streamlit.app/?unsubscribe={unsubscribe_token}"
-            email_body_html += email_template.get_email_footer(unsubscribe_url)
+            email_body_html, email_body_text = digest.finish(unsubscribe_url)
 
             # Enhanced subject line
             frequency_prefix = "📬 Weekly Digest" if frequency == "Weekly" else "⚡ Daily Update"
@@ -464,36 +802,55 @@ def send_email():
             else:
                 subject = f"{frequency_prefix}: {news_found_count} Updates Across {len(topics_with_articles)} Topics"
 
-            msg = MIMEMultipart()
+            msg = MIMEMultipart('alternative')
             msg['From'] = f"Battery Scout <{email_sender}>"
             msg['To'] = user_email
             msg['Subject'] = subject
+            msg.attach(MIMEText(email_body_text, 'plain'))
             msg.attach(MIMEText(email_body_html, 'html'))
 
-            # Create fresh SMTP connection for each email to avoid timeout
-            print(f"📧 Attempting to send email to {user_email}...")
-            try:
-                context = ssl.create_default_context()
-                print("  → Creating SMTP connection...")
-                with smtplib.SMTP_SSL('smtp.gmail.com', 465, context=context) as smtp:
-                    print("  → Logging in...")
-                    smtp.login(email_sender, email_password)
-                    print("  → Sending message...")
-                    smtp.sendmail(email_sender, user_email, msg.as_string())
-                print(f"✅ Sent email to {user_email}")
-            except smtplib.SMTPAuthenticationError as e:
-                print(f"❌ Authentication failed: {e}")
-                print(f"   Check EMAIL_ADDRESS and EMAIL_PASSWORD environment variables")
-            except smtplib.SMTPException as e:
-                print(f"❌ SMTP error: {e}")
-                import traceback
-                traceback.print_exc()
-            except Exception as e:
-                print(f"❌ Failed to send: {e}")
-                import traceback
-                traceback.print_exc()
+            # One digest per subscriber row per day: a rerun skips what was already queued
+            key = idempotency_key(run_date, user_email, raw_topics, frequency)
+            RUN_METRICS.record("render.digest", time.perf_counter() - render_start)
+            if outbox.enqueue(key, email_sender, user_email, msg.as_string()):
+                queued_digests[key] = (user_email, ledger_ids(selected))
+                RUN_METRICS.incr("digests.queued")
+            else:
+                # Not queued, so these articles were not sent: keep them eligible
+                sent_ledger.forget(user_email, ledger_ids(selected))
+                print(f"⏭️  Digest for {user_email} already queued today")
         else:
             print(f"No news for {user_email}")
 
+    # PHASE 5: wait for delivery (with retries) to finish
+    section_cache.report()
+    sent_ledger.report()
+    with RUN_METRICS.span("stage.deliver_wait"):
+        delivery.finish()
+    settle_sent_ledger(sent_ledger, outbox, queued_digests)
+    mailer.close()
+    mailer.report()
+    outbox.report()
+    outbox.close()
+
+    feed_cache.report()
+    feed_store.report()
+    feed_store.close()
+    summary_cache.report()
+    summary_cache.close()
+
+    RUN_METRICS.cache("feed_cache", feed_cache.hits, feed_cache.misses)
+    feed_stats = feed_store.stats()
+    RUN_METRICS.cache("feed_not_modified", feed_stats["not_modified"],
+                      feed_stats["fetches"] - feed_stats["not_modified"])
+    RUN_METRICS.cache("summary_cache", summary_cache.hits, summary_cache.misses)
+    RUN_METRICS.cache("section_cache", section_cache.hits, section_cache.misses)
+    RUN_METRICS.incr("subscribers.active", len(active_subscribers))
+    RUN_METRICS.incr("ai.calls", ai_call_count)
+    RUN_METRICS.incr("ai.rate_limit_wait_s", round(ai_rate_limiter.waited, 3))
+    RUN_METRICS.incr("smtp.sent", outbox.sent)
+    RUN_METRICS.incr("smtp.failed", outbox.failed)
+    RUN_METRICS.write_report()
+
 if __name__ == "__main__":
     send_email()
\ No newline at end of file
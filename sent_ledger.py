@@ -0,0 +1,130 @@
+"""
+Battery Scout - Sent Ledger
+Per-subscriber record of articles already delivered, so repeats are dropped
+before AI summarization and rendering.
+
+Subscribers and articles are stored as 8-byte hashes in one indexed
+SQLite table; entries expire after SENT_LEDGER_TTL_DAYS.
+"""
+
+import time
+from typing import Dict, Iterable, Set, Tuple
+
+import storage
+from history_store import id_hash
+
+# --- CONFIGURATION ---
+SENT_LEDGER_PATH = storage.state_path("sent_ledger.sqlite3")
+SENT_LEDGER_TTL_DAYS = 30
+
+
+def subscriber_hash(email: str) -> int:
+    """
+    Returns: 8-byte hash of a normalized (lowercased) email address
+    """
+    return id_hash(email.strip().lower())
+
+
+class SentLedger:
+    """
+    Tracks (subscriber, article id) pairs across runs.
+
+    An article id is any stable identifier: the link and the normalized
+    title are both recorded, so a re-syndicated story is caught too.
+    """
+
+    def __init__(self, path: str = SENT_LEDGER_PATH, ttl_days: float = SENT_LEDGER_TTL_DAYS):
+        """
+        Args:
+            path: SQLite database path
+            ttl_days: Entries older than this are pruned on open
+        """
+        self._conn = storage.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sent ("
+            " subscriber INTEGER NOT NULL,"
+            " article INTEGER NOT NULL,"
+            " sent_at INTEGER NOT NULL,"
+            " PRIMARY KEY (subscriber, article)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sent_at_idx ON sent(sent_at)")
+        with self._conn:
+            self._conn.execute("DELETE FROM sent WHERE sent_at < ?", (int(time.time() - ttl_days * 86400),))
+        self._pending: Set[Tuple[int, int]] = set()
+        self.lookups = 0
+        self.repeats = 0
+
+    def already_sent(self, email: str, article_ids: Iterable[str]) -> Set[str]:
+        """
+        Bulk lookup of a subscriber's whole candidate set.
+
+        Args:
+            email: Subscriber email
+            article_ids: Candidate article ids (links, normalized titles)
+
+        Returns:
+            set: The ids this subscriber has already received
+        """
+        subscriber = subscriber_hash(email)
+        by_hash: Dict[int, list] = {}
+        for article_id in article_ids:
+            by_hash.setdefault(id_hash(article_id), []).append(article_id)
+
+        found = set()
+        keys = list(by_hash)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT article FROM sent WHERE subscriber = ? AND article IN ({','.join('?' * len(chunk))})",
+                [subscriber] + chunk
+            ).fetchall()
+            for (key,) in rows:
+                found.update(by_hash[key])
+        for key in keys:
+            if (subscriber, key) in self._pending:
+                found.update(by_hash[key])
+
+        self.lookups += len(by_hash)
+        self.repeats += len(found)
+        return found
+
+    def record(self, email: str, article_ids: Iterable[str]):
+        """Buffers ids as sent to a subscriber; written on flush()."""
+        subscriber = subscriber_hash(email)
+        for article_id in article_ids:
+            self._pending.add((subscriber, id_hash(article_id)))
+
+    def forget(self, email: str, article_ids: Iterable[str]):
+        """Drops buffered ids for a subscriber (e.g. when their digest was not queued)."""
+        subscriber = subscriber_hash(email)
+        for article_id in article_ids:
+            self._pending.discard((subscriber, id_hash(article_id)))
+
+    def flush(self) -> int:
+        """
+        Writes buffered entries in one transaction.
+
+        Returns:
+            int: Number of entries written
+        """
+        if not self._pending:
+            return 0
+        now = int(time.time())
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sent (subscriber, article, sent_at) VALUES (?, ?, ?)",
+                ((subscriber, article, now) for subscriber, article in self._pending)
+            )
+        written = len(self._pending)
+        self._pending.clear()
+        return written
+
+    def report(self):
+        """Prints a one-line summary of repeats dropped this run."""
+        print(f"📒 Sent ledger: {self.repeats} repeat ids dropped out of {self.lookups} candidates checked")
+
+    def close(self):
+        """Flushes pending entries and closes the database."""
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,187 @@
+"""
+Battery Scout - Signup Queue
+Write-behind buffer for subscription form submits.
+
+Signups are committed to a local SQLite queue and acknowledged right away;
+a background flusher writes them to the sheet in batches (one append_rows /
+batch_update per flush) and backs off when the Sheets write quota is hit.
+"""
+
+import contextlib
+import threading
+import time
+from typing import Callable, ContextManager, List, Optional
+
+import storage
+from rate_limiter import is_rate_limit_error
+
+# --- CONFIGURATION ---
+SIGNUP_QUEUE_PATH = storage.state_path("signups.sqlite3")
+SIGNUP_FLUSH_INTERVAL = 5  # Seconds between flushes while signups are waiting
+SIGNUP_BATCH_SIZE = 200  # Signups written per sheet request
+SIGNUP_RETRY_SECONDS = 10  # First retry delay, doubled on each failure
+SIGNUP_MAX_RETRY_SECONDS = 600
+
+
+class SignupQueue:
+    """
+    Durable queue of pending (email, topics, frequency) rows.
+
+    A newer signup for the same email replaces a pending one, so a batch
+    never carries two rows for one subscriber.
+    """
+
+    def __init__(self, path: str = SIGNUP_QUEUE_PATH, batch_size: int = SIGNUP_BATCH_SIZE,
+                 retry_seconds: float = SIGNUP_RETRY_SECONDS,
+                 max_retry_seconds: float = SIGNUP_MAX_RETRY_SECONDS):
+        """
+        Args:
+            path: SQLite database path
+            batch_size: Maximum signups written per flush
+            retry_seconds: First backoff delay after a failed flush
+            max_retry_seconds: Backoff ceiling
+        """
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.flushed = 0
+        self.failures = 0
+        self._failed_in_row = 0
+        self._next_attempt_at = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._conn = storage.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signups ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " key TEXT NOT NULL,"
+            " email TEXT NOT NULL,"
+            " topics TEXT NOT NULL,"
+            " frequency TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signups_key ON signups(key)")
+        self._conn.commit()
+
+    def enqueue(self, email: str, topics: str, frequency: str):
+        """
+        Durably records a signup (committed before returning).
+
+        Args:
+            email: Subscriber email
+            topics: Pipe-separated topic string
+            frequency: 'Daily' or 'Weekly'
+        """
+        key = email.strip().lower()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM signups WHERE key = ?", (key,))
+                self._conn.execute(
+                    "INSERT INTO signups (key, email, topics, frequency, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, email.strip(), topics, frequency, time.time())
+                )
+        self._wake.set()
+
+    def discard(self, email: str) -> int:
+        """
+        Drops pending signups for an email (e.g. on unsubscribe).
+
+        Returns:
+            int: Number of signups removed
+        """
+        with self._lock:
+            with self._conn:
+                return self._conn.execute(
+                    "DELETE FROM signups WHERE key = ?", (email.strip().lower(),)
+                ).rowcount
+
+    def pending_count(self) -> int:
+        """
+        Returns: Number of signups not yet written to the sheet
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signups").fetchone()[0]
+
+    def flush(self, write_batch: Callable[[List[List[str]]], None],
+              write_lock: Optional[ContextManager] = None) -> int:
+        """
+        Writes one batch of pending signups.
+
+        Rows are removed from the queue only after write_batch returns, so a
+        failed or interrupted flush loses nothing.
+
+        Args:
+            write_batch: Callable receiving [email, topics, frequency] rows; raises on failure
+            write_lock: Held from reading the batch until it is written and
+                removed; callers that discard() and then delete from the sheet
+                hold the same lock, so an unsubscribe never lands between the
+                read and the write (and gets undone by it)
+
+        Returns:
+            int: Number of signups written
+        """
+        with write_lock or contextlib.nullcontext():
+            with self._lock:
+                batch = self._conn.execute(
+                    "SELECT id, email, topics, frequency FROM signups ORDER BY id LIMIT ?", (self.batch_size,)
+                ).fetchall()
+            if not batch:
+                return 0
+
+            write_batch([[email, topics, frequency] for _, email, topics, frequency in batch])
+
+            ids = [row[0] for row in batch]
+            with self._lock:
+                with self._conn:
+                    self._conn.execute(f"DELETE FROM signups WHERE id IN ({','.join('?' * len(ids))})", ids)
+        self.flushed += len(batch)
+        return len(batch)
+
+    def _run(self, write_batch: Callable[[List[List[str]]], None], interval: float,
+             write_lock: Optional[ContextManager]):
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            if time.monotonic() < self._next_attempt_at:
+                continue
+            try:
+                while self.flush(write_batch, write_lock) == self.batch_size:
+                    pass
+                self._failed_in_row = 0
+            except Exception as e:
+                self.failures += 1
+                self._failed_in_row += 1
+                delay = min(self.retry_seconds * (2 ** (self._failed_in_row - 1)), self.max_retry_seconds)
+                self._next_attempt_at = time.monotonic() + delay
+                reason = "Sheets quota hit" if is_rate_limit_error(e) else f"write failed: {e}"
+                print(f"⚠️ Signup flush {reason}; {self.pending_count()} queued, retrying in {delay:.0f}s")
+
+    def start(self, write_batch: Callable[[List[List[str]]], None],
+              interval: float = SIGNUP_FLUSH_INTERVAL, write_lock: Optional[ContextManager] = None) -> bool:
+        """
+        Starts the background flusher (once per process).
+
+        Signups left over from a previous process are flushed on the first pass.
+
+        Args:
+            write_batch: Callable receiving [email, topics, frequency] rows; raises on failure
+            interval: Seconds between flush passes
+            write_lock: Lock held around each batch write (see flush())
+
+        Returns:
+            bool: True if a new flusher thread was started
+        """
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._thread = threading.Thread(target=self._run, args=(write_batch, interval, write_lock),
+                                            daemon=True)
+            self._thread.start()
+        self._wake.set()
+        return True
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,48 @@
+"""
+Battery Scout - Local State Storage
+Shared helpers for the on-disk stores that persist between daily runs.
+"""
+
+import os
+import sqlite3
+
+# --- CONFIGURATION ---
+# Everything the daily job remembers between runs lives under this directory
+# (restored/saved by the GitHub Actions cache step)
+STATE_DIR = os.environ.get("SCOUT_STATE_DIR", ".scout_state")
+
+
+def state_path(filename: str) -> str:
+    """
+    Returns the path of a file inside the state directory.
+
+    Args:
+        filename: File name, e.g. 'summaries.sqlite3'
+
+    Returns:
+        str: Path under STATE_DIR
+    """
+    return os.path.join(STATE_DIR, filename)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Opens a SQLite database, creating its parent directory if needed.
+
+    The connection may be shared between threads; callers serialize access
+    with their own lock.
+
+    Args:
+        path: Database file path (or ':memory:')
+
+    Returns:
+        sqlite3.Connection: Open connection in WAL mode
+    """
+    if path != ":memory:":
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,303 @@
+"""
+Battery Scout - Subscriber Store
+One interface for reading subscribers, whatever the backend:
+- SheetSubscriberStore reads the Google Sheet (any client: Sheets v4 or gspread)
+- SQLiteSubscriberStore is an indexed local snapshot, kept up to date with
+  a one-way sync from the sheet so jobs and tests can run offline.
+
+Sheet structure: Email | Topics | Frequency (row 1 is the header).
+"""
+
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import storage
+
+# --- CONFIGURATION ---
+SUBSCRIBER_DB_PATH = storage.state_path("subscribers.sqlite3")
+SUBSCRIBER_RANGE = "Sheet1!A:C"
+SUBSCRIBER_PAGE_SIZE = int(os.environ.get("SUBSCRIBER_PAGE_SIZE", "500"))  # Rows per sheet read
+
+_COLUMNS_RE = re.compile(r"^(?:(.+)!)?([A-Z]+)\d*:([A-Z]+)\d*$")
+
+
+class Subscriber(NamedTuple):
+    """One subscription row."""
+    row: int  # Sheet row number (1-based, header is row 1)
+    email: str
+    topics: str  # Pipe-separated topic string
+    frequency: str  # 'Daily' or 'Weekly'
+
+    @property
+    def topic_list(self) -> List[str]:
+        return [topic for topic in self.topics.split("|") if topic]
+
+
+def parse_row(row: int, values: List[str]) -> Optional[Subscriber]:
+    """
+    Turns raw sheet values into a Subscriber.
+
+    Args:
+        row: Sheet row number
+        values: Cell values [email, topics, frequency] (trailing cells may be missing)
+
+    Returns:
+        Optional[Subscriber]: None for blank or malformed rows
+    """
+    email = values[0].strip() if values else ""
+    topics = values[1].strip() if len(values) > 1 else ""
+    # Default to "Daily" for rows written before the frequency column existed
+    frequency = values[2].strip() if len(values) > 2 and values[2].strip() else "Daily"
+    if not email or "@" not in email or not topics:
+        return None
+    return Subscriber(row, email, topics, frequency)
+
+
+class SubscriberStore(ABC):
+    """Read interface shared by all backends."""
+
+    @abstractmethod
+    def iter_subscribers(self, frequency: Optional[str] = None) -> Iterator[Subscriber]:
+        """
+        Yields subscribers in sheet order.
+
+        Args:
+            frequency: Only yield this frequency ('Daily' / 'Weekly'), or all if None
+        """
+
+    def find(self, email: str) -> List[Subscriber]:
+        """
+        Returns: Every row subscribed with this email (case-insensitive)
+        """
+        key = email.strip().lower()
+        return [s for s in self.iter_subscribers() if s.email.lower() == key]
+
+
+def page_ranges(range_name: str, page_size: int, first_row: int = 2) -> Iterator[Tuple[int, str]]:
+    """
+    Splits a column range into fixed-size row windows.
+
+    Args:
+        range_name: Column range such as 'Sheet1!A:C' or 'A:C'
+        page_size: Rows per window
+        first_row: First row to read (row 1 is the header)
+
+    Yields:
+        tuple: (first row number, A1 range) e.g. (2, 'Sheet1!A2:C501')
+    """
+    match = _COLUMNS_RE.match(range_name)
+    if not match:
+        raise ValueError(f"Expected a column range like 'Sheet1!A:C', got {range_name!r}")
+    sheet, first_col, last_col = match.groups()
+    prefix = f"{sheet}!" if sheet else ""
+    start = first_row
+    while True:
+        yield start, f"{prefix}{first_col}{start}:{last_col}{start + page_size - 1}"
+        start += page_size
+
+
+class SheetSubscriberStore(SubscriberStore):
+    """
+    Subscribers read straight from the Google Sheet, one row window at a time.
+
+    Pages are requested lazily as the caller iterates, so memory stays at
+    one page however long the sheet grows. Paging bounds memory and request
+    size, not latency: a caller that consumes every subscriber (such as
+    sync_snapshot) still waits for the last page.
+    """
+
+    def __init__(self, read_range: Callable[[str], List[List[str]]], range_name: str = SUBSCRIBER_RANGE,
+                 page_size: int = SUBSCRIBER_PAGE_SIZE):
+        """
+        Args:
+            read_range: Callable(a1_range) returning cell values, e.g. a Sheets v4
+                values().get(...) wrapper or gspread's worksheet.get
+            range_name: Column range holding the subscriber columns
+            page_size: Rows per read
+        """
+        self.read_range = read_range
+        self.range_name = range_name
+        self.page_size = page_size
+        self.pages_read = 0
+
+    def iter_pages(self) -> Iterator[Tuple[int, List[List[str]]]]:
+        """
+        Yields (first row number, raw cell values) per window.
+
+        The API trims trailing blank rows, so a short page is not proof of
+        the end; reading stops at the first empty window.
+        """
+        for start, a1_range in page_ranges(self.range_name, self.page_size):
+            values = self.read_range(a1_range) or []
+            self.pages_read += 1
+            if not values:
+                return
+            yield start, values
+
+    def iter_subscribers(self, frequency: Optional[str] = None) -> Iterator[Subscriber]:
+        for start, values in self.iter_pages():
+            for row, cells in enumerate(values, start=start):
+                subscriber = parse_row(row, cells)
+                if subscriber and (frequency is None or subscriber.frequency == frequency):
+                    yield subscriber
+
+
+class SQLiteSubscriberStore(SubscriberStore):
+    """Indexed local snapshot of the subscriber sheet."""
+
+    def __init__(self, path: str = SUBSCRIBER_DB_PATH):
+        """
+        Args:
+            path: SQLite database path
+        """
+        self._conn = storage.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS subscribers ("
+            " row INTEGER PRIMARY KEY,"
+            " email TEXT NOT NULL,"
+            " email_key TEXT NOT NULL,"
+            " topics TEXT NOT NULL,"
+            " frequency TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS subscribers_email ON subscribers(email_key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS subscribers_frequency ON subscribers(frequency)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+        self._conn.commit()
+
+    def iter_subscribers(self, frequency: Optional[str] = None) -> Iterator[Subscriber]:
+        if frequency is None:
+            cursor = self._conn.execute("SELECT row, email, topics, frequency FROM subscribers ORDER BY row")
+        else:
+            cursor = self._conn.execute(
+                "SELECT row, email, topics, frequency FROM subscribers WHERE frequency = ? ORDER BY row",
+                (frequency,)
+            )
+        for values in cursor:
+            yield Subscriber(*values)
+
+    def find(self, email: str) -> List[Subscriber]:
+        rows = self._conn.execute(
+            "SELECT row, email, topics, frequency FROM subscribers WHERE email_key = ? ORDER BY row",
+            (email.strip().lower(),)
+        ).fetchall()
+        return [Subscriber(*values) for values in rows]
+
+    def count(self) -> int:
+        """
+        Returns: Number of subscriber rows in the snapshot
+        """
+        return self._conn.execute("SELECT COUNT(*) FROM subscribers").fetchone()[0]
+
+    def last_synced(self) -> Optional[float]:
+        """
+        Returns: Unix time of the last successful sync, or None if never synced
+        """
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = 'synced_at'").fetchone()
+        return row[0] if row else None
+
+    def sync_from(self, source: SubscriberStore) -> Tuple[int, int, int]:
+        """
+        One-way sync: makes the snapshot match the source.
+
+        The source is consumed in chunks of SUBSCRIBER_PAGE_SIZE rows, each
+        compared against the same row span of the snapshot, so memory stays
+        flat. Only changed rows are written, all in one transaction, so a
+        failed read leaves the previous snapshot intact.
+
+        Args:
+            source: Store to copy from (normally a SheetSubscriberStore)
+
+        Returns:
+            tuple: (added, changed, removed) row counts
+        """
+        added = changed = removed = 0
+        last_row = 1
+        chunk: List[Subscriber] = []
+
+        def apply(chunk: List[Subscriber], first_row: int, end_row: int):
+            nonlocal added, changed, removed
+            existing: Dict[int, Tuple[str, str, str]] = {
+                row: (email, topics, frequency)
+                for row, email, topics, frequency in self._conn.execute(
+                    "SELECT row, email, topics, frequency FROM subscribers WHERE row BETWEEN ? AND ?",
+                    (first_row, end_row)
+                )
+            }
+            upserts = []
+            for subscriber in chunk:
+                current = existing.pop(subscriber.row, None)
+                if current == (subscriber.email, subscriber.topics, subscriber.frequency):
+                    continue
+                if current is None:
+                    added += 1
+                else:
+                    changed += 1
+                upserts.append((subscriber.row, subscriber.email, subscriber.email.lower(),
+                                subscriber.topics, subscriber.frequency))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO subscribers (row, email, email_key, topics, frequency)"
+                " VALUES (?, ?, ?, ?, ?)",
+                upserts
+            )
+            # Rows in this span the source no longer has (deleted or now invalid)
+            self._conn.executemany("DELETE FROM subscribers WHERE row = ?", ((row,) for row in existing))
+            removed += len(existing)
+
+        with self._conn:
+            for subscriber in source.iter_subscribers():
+                chunk.append(subscriber)
+                if len(chunk) >= SUBSCRIBER_PAGE_SIZE:
+                    apply(chunk, last_row + 1, subscriber.row)
+                    last_row = subscriber.row
+                    chunk = []
+            end_row = chunk[-1].row if chunk else last_row
+            apply(chunk, last_row + 1, end_row)
+            # Everything past the source's last row is gone
+            removed += self._conn.execute("DELETE FROM subscribers WHERE row > ?", (end_row,)).rowcount
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('synced_at', ?)", (time.time(),)
+            )
+        return added, changed, removed
+
+    def close(self):
+        """Closes the underlying database connection."""
+        self._conn.close()
+
+
+def sync_snapshot(source: SubscriberStore, path: str = SUBSCRIBER_DB_PATH,
+                  offline: bool = False) -> SQLiteSubscriberStore:
+    """
+    Opens the local snapshot and refreshes it from the source.
+
+    The whole source is read (page by page) before this returns. If the
+    source cannot be read, the previous snapshot is used as is.
+
+    Args:
+        source: Store to sync from
+        path: SQLite database path
+        offline: Skip the sync and use the snapshot as is (tests, outages)
+
+    Returns:
+        SQLiteSubscriberStore: The up-to-date (or last known) snapshot
+
+    Raises:
+        Exception: If the source fails and there is no earlier snapshot
+    """
+    snapshot = SQLiteSubscriberStore(path)
+    if offline:
+        print(f"📇 Using offline subscriber snapshot ({snapshot.count()} rows)")
+        return snapshot
+    try:
+        added, changed, removed = snapshot.sync_from(source)
+        print(f"📇 Subscribers synced: {snapshot.count()} rows "
+              f"({added} added, {changed} changed, {removed} removed)")
+    except Exception as e:
+        if snapshot.last_synced() is None:
+            snapshot.close()
+            raise
+        age_hours = (time.time() - snapshot.last_synced()) / 3600
+        print(f"⚠️ Subscriber sync failed ({e}); using snapshot from {age_hours:.1f}h ago")
+    return snapshot
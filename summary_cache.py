@@ -0,0 +1,141 @@
+"""
+Battery Scout - AI Summary Cache
+Persistent SQLite cache of Gemini summaries so each article is summarized
+at most once across subscribers and across daily runs.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Dict, Optional
+
+import storage
+
+# --- CONFIGURATION ---
+SUMMARY_CACHE_PATH = storage.state_path("summaries.sqlite3")
+SUMMARY_CACHE_TTL_DAYS = 14
+# Bump whenever the summarization prompts change so stale summaries are ignored
+PROMPT_VERSION = "1"
+
+
+def summary_key(title: str, snippet: str, lang_code: str, prompt_version: str = PROMPT_VERSION) -> str:
+    """
+    Builds the content hash used as the cache key.
+
+    Args:
+        title: Article title
+        snippet: Article snippet/description
+        lang_code: Language code (e.g., "en", "zh", "de")
+        prompt_version: Version of the summarization prompts
+
+    Returns:
+        str: Hex SHA-256 digest of the normalized fields
+    """
+    payload = "\x1f".join([
+        prompt_version,
+        lang_code or "",
+        " ".join((title or "").split()),
+        " ".join((snippet or "").split())
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    On-disk summary cache with TTL eviction.
+
+    An empty string is a valid cached value: it records that the model
+    answered SKIP, which is worth remembering as much as a real summary.
+    """
+
+    def __init__(self, path: str = SUMMARY_CACHE_PATH, ttl_days: float = SUMMARY_CACHE_TTL_DAYS):
+        """
+        Args:
+            path: SQLite database path (opened lazily on first use)
+            ttl_days: Entries older than this are evicted
+        """
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = storage.connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                " key TEXT PRIMARY KEY,"
+                " summary TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_created ON summaries(created_at)")
+            self._conn.commit()
+            self._prune()
+        return self._conn
+
+    def _prune(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        deleted = self._conn.execute("DELETE FROM summaries WHERE created_at < ?", (cutoff,)).rowcount
+        self._conn.commit()
+        return deleted
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Looks up a cached summary.
+
+        Args:
+            key: Key from summary_key()
+
+        Returns:
+            Optional[str]: Cached summary ("" for SKIP), or None on a miss
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT summary FROM summaries WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, summary: str):
+        """
+        Stores a summary (use "" to record a SKIP answer).
+
+        Args:
+            key: Key from summary_key()
+            summary: Summary text
+        """
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created_at) VALUES (?, ?, ?)",
+                (key, summary, time.time())
+            )
+            db.commit()
+            self.stores += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns: Dictionary with hit, miss and store counts
+        """
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores}
+
+    def report(self):
+        """Prints a one-line summary of cache usage for the run."""
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        print(f"🧠 Summary cache: {self.hits} hits / {self.misses} misses "
+              f"({hit_rate:.0f}% hit rate), {self.hits} AI calls saved, {self.stores} new summaries stored")
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
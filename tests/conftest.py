@@ -0,0 +1,12 @@
+"""
+Battery Scout - Test Configuration
+Puts the repository root on sys.path and keeps run state out of the tree.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SCOUT_STATE_DIR", tempfile.mkdtemp(prefix="scout_state_"))
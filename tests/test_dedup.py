@@ -0,0 +1,66 @@
+"""
+Battery Scout - Near-Duplicate Detection Tests
+Different stories must stay apart; copies and translations must collapse.
+"""
+
+from dedup import anchors, collapse_near_duplicates
+
+
+def article(title, lang="en", snippet=None, source="Reuters", is_translated=False):
+    return {"title": title, "snippet": title if snippet is None else snippet, "source": source,
+            "lang": lang, "is_translated": is_translated}
+
+
+def clusters(articles):
+    representatives = collapse_near_duplicates(articles)
+    groups = {}
+    for a in articles:
+        groups.setdefault(id(representatives[id(a)]), []).append(a["title"])
+    return sorted(groups.values())
+
+
+def test_same_language_stories_sharing_anchors_stay_apart():
+    pool = [article("CATL expands LFP output in 2026"), article("Ford to buy CATL LFP cells from 2026")]
+    assert len(clusters(pool)) == 2
+
+
+def test_plant_openings_in_different_states_stay_apart():
+    pool = [article(f"{maker} Opens New Battery Plant In {state}")
+            for maker, state in (("Tesla", "Texas"), ("Ford", "Kentucky"), ("GM", "Ohio"), ("Panasonic", "Kansas"))]
+    assert len(clusters(pool)) == 4
+
+
+def test_syndicated_copies_collapse():
+    title = "CATL unveils 4C Shenxing LFP battery with 400 km of range in 10 minutes of charging"
+    pool = [article(title, source="Reuters"), article(title, source="Electrek")]
+    assert len(clusters(pool)) == 1
+
+
+def test_translated_coverage_collapses_onto_the_english_original():
+    english = article("CATL unveils 4C Shenxing LFP battery with 400 km in 10 minutes")
+    chinese = article("宁德时代发布神行 Shenxing 4C LFP 电池，充电 10 分钟续航 400 km", lang="zh", snippet="CATL",
+                      source="新浪", is_translated=True)
+    representatives = collapse_near_duplicates([chinese, english])
+    assert representatives[id(chinese)] is english
+
+
+def test_no_chaining_through_a_shared_neighbour():
+    # Anchor Jaccard: A~B 0.83, B~C 0.71, but A~C only 0.57
+    pool = [
+        article("CATL 与 LFP NCM BYD SK 电池", lang="zh"),
+        article("CATL と LFP NCM BYD SK LG 電池", lang="ja"),
+        article("LFP 및 NCM BYD SK LG EVE 배터리", lang="ko"),
+    ]
+    assert sorted(len(group) for group in clusters(pool)) == [1, 2]
+
+
+def test_years_and_numbers_alone_are_not_anchors_enough():
+    # Identical anchor sets {lfp, 20, 2026}, but only one of them is a name
+    pool = [article("LFP cell prices fall 20% in 2026", lang="en"),
+            article("LFP 电芯价格 2026 年下降 20%", lang="zh")]
+    assert len(clusters(pool)) == 2
+
+
+def test_title_case_headline_words_are_not_names():
+    assert anchors("Tesla Opens New Battery Plant In Texas") == frozenset()
+    assert anchors("宁德时代 CATL 与 Stellantis 合资 LFP 工厂") == {"catl", "stellantis", "lfp"}
@@ -0,0 +1,102 @@
+"""
+Battery Scout - Feed Fetching Tests
+Conditional requests against a local HTTP server and per-run cache counting.
+"""
+
+import http.server
+import threading
+
+import pytest
+
+pytest.importorskip("feedparser")
+
+from feeds import FeedCache, FeedStore  # noqa: E402
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>News</title>
+<item><title>CATL starts sodium-ion production</title><link>https://example.com/a</link>
+<pubDate>Mon, 05 Oct 2026 08:00:00 GMT</pubDate></item>
+</channel></rss>"""
+ETAG = '"v1"'
+
+
+class FeedHandler(http.server.BaseHTTPRequestHandler):
+    """Serves RSS with an ETag, answering 304 when the client already has it."""
+
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path.startswith("/missing"):
+            self.send_error(404)
+        elif self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", str(len(RSS)))
+            self.end_headers()
+            self.wfile.write(RSS)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    FeedHandler.requests = []
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_second_run_sends_etag_and_serves_304_from_store(server, tmp_path):
+    path = str(tmp_path / "feeds.sqlite3")
+    url = f"{server}/rss/search?q=sodium&hl=en-US"
+
+    store = FeedStore(path)
+    first = store.fetch(url, timeout=5)
+    assert [e.title for e in first.entries] == ["CATL starts sodium-ion production"]
+    assert store.stats()["not_modified"] == 0
+    store.close()
+
+    store = FeedStore(path)  # Next run: validators come from disk
+    second = store.fetch(url, timeout=5)
+    assert [e.title for e in second.entries] == ["CATL starts sodium-ion production"]
+    stats = store.stats()
+    assert (stats["fetches"], stats["not_modified"], stats["errors"]) == (1, 1, 0)
+    assert stats["bytes_downloaded"] == 0 and stats["bytes_saved"] == len(RSS)
+    store.close()
+
+    assert [etag for _, etag in FeedHandler.requests] == [None, ETAG]
+
+
+def test_http_errors_yield_an_empty_feed(server, tmp_path):
+    store = FeedStore(str(tmp_path / "feeds.sqlite3"))
+    feed = store.fetch(f"{server}/missing", timeout=5)
+    assert feed.entries == [] and feed.bozo
+    assert store.stats()["errors"] == 1
+    store.close()
+
+
+def test_cache_counts_prefetched_feeds_as_misses_and_repeats_as_hits():
+    fetched = []
+
+    def fetcher(url):
+        fetched.append(url)
+        return {"url": url}
+
+    cache = FeedCache(fetcher)
+    urls = ["https://News.Google.com/rss?q=a&hl=en", "https://news.google.com/rss?hl=en&q=a",
+            "https://news.google.com/rss?q=b&hl=en"]
+    assert cache.prefetch(urls, max_workers=2) == 2
+    cache.get(urls[0])
+    cache.get(urls[1])
+    cache.get(urls[2])
+    assert len(fetched) == 2
+    assert cache.stats() == {"hits": 1, "misses": 2, "prefetched": 2, "feeds": 2}
@@ -0,0 +1,108 @@
+"""
+Battery Scout - Outbox Tests
+Retry, idempotency and scrubbing states of the durable outbox.
+"""
+
+import sqlite3
+
+import pytest
+
+from outbox import EXPIRED, FAILED, PENDING, SENDING, SENT, Outbox, idempotency_key
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "outbox.sqlite3")
+
+
+def row(path, key):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(
+            "SELECT status, attempts, sender, recipient, message FROM outbox WHERE key = ?", (key,)
+        ).fetchone()
+
+
+def test_idempotency_key_is_stable_and_distinct():
+    assert idempotency_key("2026-01-05", "a@x.com") == idempotency_key("2026-01-05", "a@x.com")
+    assert idempotency_key("2026-01-05", "a@x.com") != idempotency_key("2026-01-06", "a@x.com")
+
+
+def test_enqueue_is_idempotent(path):
+    outbox = Outbox(path)
+    assert outbox.enqueue("k", "me@x.com", "a@x.com", "body")
+    assert not outbox.enqueue("k", "me@x.com", "a@x.com", "body again")
+    assert outbox.is_queued("k")
+    assert outbox.pending_count() == 1
+
+
+def test_failed_delivery_is_retried_then_marked_failed_and_scrubbed(path):
+    outbox = Outbox(path, max_attempts=2, retry_seconds=0)
+    outbox.enqueue("k", "me@x.com", "a@x.com", "body")
+    attempts = []
+
+    def send(sender, recipient, message):
+        attempts.append(recipient)
+        raise OSError("connection refused")
+
+    outbox.deliver(send)
+    assert attempts == ["a@x.com", "a@x.com"]
+    assert (outbox.retries, outbox.failed, outbox.sent) == (1, 1, 0)
+    assert row(path, "k") == (FAILED, 2, "", "", "")
+    assert outbox.pending_count() == 0
+
+
+def test_sent_rows_are_scrubbed_and_block_requeue(path):
+    outbox = Outbox(path)
+    outbox.enqueue("k", "me@x.com", "a@x.com", "body")
+    outbox.deliver(lambda sender, recipient, message: None)
+    assert row(path, "k") == (SENT, 1, "", "", "")
+    assert outbox.is_queued("k")
+    assert not outbox.enqueue("k", "me@x.com", "a@x.com", "body")
+
+
+def test_rerun_after_failure_requeues_the_message(path):
+    outbox = Outbox(path, max_attempts=1)
+    outbox.enqueue("k", "me@x.com", "a@x.com", "body")
+    outbox.deliver(lambda sender, recipient, message: (_ for _ in ()).throw(OSError("bad login")))
+    assert row(path, "k")[0] == FAILED
+    outbox.close()
+
+    rerun = Outbox(path, max_attempts=1)
+    assert not rerun.is_queued("k")
+    assert rerun.enqueue("k", "me@x.com", "a@x.com", "fresh body")
+    delivered = []
+    rerun.deliver(lambda sender, recipient, message: delivered.append(message))
+    assert delivered == ["fresh body"]
+    assert row(path, "k")[0] == SENT
+
+
+def test_claimed_message_is_recovered_after_a_crash(path):
+    outbox = Outbox(path)
+    outbox.enqueue("k", "me@x.com", "a@x.com", "body")
+    assert outbox.claim()["key"] == "k"  # Process dies while sending
+    outbox.close()
+
+    assert row(path, "k")[0] == SENDING
+    reopened = Outbox(path)
+    assert reopened.pending_count() == 1
+    assert reopened.claim()["message"] == "body"
+
+
+def test_stale_messages_expire_and_old_finished_rows_are_deleted(path):
+    outbox = Outbox(path)
+    outbox.enqueue("stale", "me@x.com", "a@x.com", "body")
+    outbox.close()
+
+    Outbox(path, max_age_hours=0).close()
+    assert row(path, "stale") == (EXPIRED, 0, "", "", "")
+
+    Outbox(path, retention_days=0).close()
+    assert row(path, "stale") is None
+
+
+def test_pending_messages_are_not_deleted_by_retention(path):
+    outbox = Outbox(path)
+    outbox.enqueue("k", "me@x.com", "a@x.com", "body")
+    outbox.close()
+    Outbox(path, retention_days=0).close()
+    assert row(path, "k")[0] == PENDING
@@ -0,0 +1,18 @@
+"""
+Battery Scout - Query Plan Tests
+English query qualification for single and Boolean topics.
+"""
+
+from query_plan import english_query
+
+
+def test_single_topic_gets_battery_qualifier():
+    assert english_query("Solid-State") == "Solid-State battery"
+    assert english_query("Battery Recycling") == "Battery Recycling"
+
+
+def test_boolean_topic_is_qualified_unless_every_alternative_is():
+    assert english_query('("sodium battery" OR "Na-ion")') == '("sodium battery" OR "Na-ion") battery'
+    assert english_query('("sodium battery" OR "Na-ion battery")') == '("sodium battery" OR "Na-ion battery")'
+    assert english_query('("grid storage" OR "BESS")', keywords=("battery", "storage")) == \
+        '("grid storage" OR "BESS") battery'
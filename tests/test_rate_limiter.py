@@ -0,0 +1,104 @@
+"""
+Battery Scout - Rate Limiter Tests
+Token bucket pacing and 429 backoff, driven by a fake clock.
+"""
+
+import pytest
+
+from rate_limiter import TokenBucket, call_with_backoff, is_rate_limit_error
+
+
+class FakeClock:
+    """Clock whose sleep() just advances time."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_bucket(clock, requests_per_minute=60, burst=1):
+    return TokenBucket(requests_per_minute, burst=burst, clock=clock, sleep=clock.sleep)
+
+
+def test_bucket_paces_to_the_configured_rate():
+    clock = FakeClock()
+    bucket = make_bucket(clock, requests_per_minute=30)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(2.0)
+    assert bucket.acquire() == pytest.approx(2.0)
+    assert bucket.waited == pytest.approx(4.0)
+    assert clock.now == pytest.approx(104.0)
+
+
+def test_bucket_burst_and_idle_refill():
+    clock = FakeClock()
+    bucket = make_bucket(clock, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(1.0)
+    clock.now += 60  # Idle time refills only up to the burst size
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_pause_blocks_until_it_expires():
+    clock = FakeClock()
+    bucket = make_bucket(clock, requests_per_minute=600, burst=5)
+    bucket.pause(30)
+    assert bucket.acquire() == pytest.approx(30.0)
+
+
+def test_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_backoff_retries_quota_errors_with_doubling_pauses(capsys):
+    clock = FakeClock()
+    bucket = make_bucket(clock, requests_per_minute=600)
+    failures = [Exception("429 Too Many Requests"), Exception("RESOURCE_EXHAUSTED")]
+
+    def flaky():
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    start = clock.now
+    assert call_with_backoff(flaky, bucket, max_retries=3, base_delay=10) == "ok"
+    assert clock.now - start == pytest.approx(30.0)  # 10s + 20s pauses
+    assert "retry 2/3" in capsys.readouterr().out
+
+
+def test_backoff_gives_up_after_max_retries():
+    clock = FakeClock()
+    bucket = make_bucket(clock, requests_per_minute=600)
+    calls = []
+
+    def exhausted():
+        calls.append(clock.now)
+        raise Exception("429 quota")
+
+    with pytest.raises(Exception, match="429"):
+        call_with_backoff(exhausted, bucket, max_retries=2, base_delay=1)
+    assert len(calls) == 3
+
+
+def test_backoff_does_not_retry_other_errors():
+    clock = FakeClock()
+    bucket = make_bucket(clock)
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        call_with_backoff(broken, bucket)
+    assert calls == [1] and clock.sleeps == []
+    assert not is_rate_limit_error(ValueError("bad request"))
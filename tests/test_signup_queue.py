@@ -0,0 +1,74 @@
+"""
+Battery Scout - Signup Queue Tests
+Batching, failure handling and the unsubscribe race of the write-behind queue.
+"""
+
+import threading
+
+import pytest
+
+from signup_queue import SignupQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SignupQueue(str(tmp_path / "signups.sqlite3"), batch_size=2)
+    yield queue
+    queue.close()
+
+
+def test_newer_signup_replaces_the_pending_one(queue):
+    queue.enqueue("A@x.com", "LFP", "Daily")
+    queue.enqueue("a@x.com ", "Sodium-Ion", "Weekly")
+    written = []
+    assert queue.flush(written.extend) == 1
+    assert written == [["a@x.com", "Sodium-Ion", "Weekly"]]
+
+
+def test_flush_writes_in_batches_and_keeps_rows_on_failure(queue):
+    for i in range(3):
+        queue.enqueue(f"user{i}@x.com", "LFP", "Daily")
+
+    def fail(rows):
+        raise OSError("quota")
+
+    with pytest.raises(OSError):
+        queue.flush(fail)
+    assert queue.pending_count() == 3
+
+    written = []
+    assert queue.flush(written.extend) == 2
+    assert queue.flush(written.extend) == 1
+    assert [row[0] for row in written] == ["user0@x.com", "user1@x.com", "user2@x.com"]
+    assert queue.pending_count() == 0
+
+
+def test_unsubscribe_during_flush_is_not_undone(queue):
+    sheet = set()
+    lock = threading.RLock()
+    batch_read = threading.Event()
+    release = threading.Event()
+
+    def write_batch(rows):
+        batch_read.set()
+        release.wait(5)
+        sheet.update(row[0] for row in rows)
+
+    def unsubscribe(email):
+        # Same sequence as utils.remove_subscriber: discard, then delete from the sheet
+        with lock:
+            queue.discard(email)
+            sheet.discard(email)
+
+    queue.enqueue("a@x.com", "LFP", "Daily")
+    flusher = threading.Thread(target=queue.flush, args=(write_batch, lock))
+    flusher.start()
+    assert batch_read.wait(5)
+    remover = threading.Thread(target=unsubscribe, args=("a@x.com",))
+    remover.start()
+    release.set()
+    flusher.join(5)
+    remover.join(5)
+
+    assert "a@x.com" not in sheet
+    assert queue.pending_count() == 0
@@ -0,0 +1,77 @@
+"""
+Battery Scout - Subscriber Store Tests
+Paging through a sheet-like backend and the one-way SQLite sync.
+"""
+
+import pytest
+
+from subscriber_store import (SheetSubscriberStore, SQLiteSubscriberStore, SubscriberStore, page_ranges,
+                              sync_snapshot)
+
+ROWS = [
+    ["Email", "Topics", "Frequency"],
+    ["a@x.com", "LFP|Sodium-Ion", "Daily"],
+    ["", "", ""],  # Blank row left by a manual delete
+    ["b@x.com", "Sodium-Ion", "Weekly"],
+    ["c@x.com", "Solid-State"],  # Written before the frequency column existed
+]
+
+
+class FakeSheet:
+    """Serves A1 row windows ('A2:C3') from a list of rows, like values().get()."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.reads = []
+
+    def read(self, a1_range):
+        self.reads.append(a1_range)
+        first, last = (int("".join(c for c in part if c.isdigit())) for part in a1_range.split(":"))
+        values = self.rows[first - 1:last]
+        while values and not any(values[-1]):
+            values = values[:-1]  # The API trims trailing blank rows
+        return values
+
+
+def test_subscriber_store_is_abstract():
+    with pytest.raises(TypeError):
+        SubscriberStore()
+
+
+def test_page_ranges():
+    ranges = page_ranges("Sheet1!A:C", 2)
+    assert [next(ranges) for _ in range(2)] == [(2, "Sheet1!A2:C3"), (4, "Sheet1!A4:C5")]
+    with pytest.raises(ValueError):
+        next(page_ranges("A1", 2))
+
+
+def test_sheet_store_pages_until_an_empty_window():
+    sheet = FakeSheet(ROWS)
+    store = SheetSubscriberStore(sheet.read, "A:C", page_size=2)
+    subscribers = list(store.iter_subscribers())
+    assert [(s.row, s.email, s.frequency) for s in subscribers] == [
+        (2, "a@x.com", "Daily"), (4, "b@x.com", "Weekly"), (5, "c@x.com", "Daily")]
+    assert sheet.reads == ["A2:C3", "A4:C5", "A6:C7"]
+    assert [s.email for s in store.iter_subscribers("Weekly")] == ["b@x.com"]
+
+
+def test_sync_applies_changes_and_falls_back_to_the_last_snapshot(tmp_path):
+    path = str(tmp_path / "subscribers.sqlite3")
+    rows = [list(row) for row in ROWS]
+    snapshot = sync_snapshot(SheetSubscriberStore(FakeSheet(rows).read, "A:C", page_size=2), path)
+    assert snapshot.count() == 3
+    snapshot.close()
+
+    rows[1] = ["a@x.com", "LFP", "Weekly"]
+    del rows[4]
+    store = SQLiteSubscriberStore(path)
+    assert store.sync_from(SheetSubscriberStore(FakeSheet(rows).read, "A:C", page_size=2)) == (0, 1, 1)
+    assert [s.topics for s in store.find("A@X.COM")] == ["LFP"]
+    store.close()
+
+    def unreachable(a1_range):
+        raise OSError("sheet down")
+
+    snapshot = sync_snapshot(SheetSubscriberStore(unreachable, "A:C"), path)
+    assert [s.email for s in snapshot.iter_subscribers()] == ["a@x.com", "b@x.com"]
+    snapshot.close()
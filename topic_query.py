@@ -0,0 +1,128 @@
+"""
+Battery Scout - Topic Query Compiler
+Compiles Boolean topic expressions such as
+    ("silicon anode" OR "Si-anode" OR "Si/C composite")
+into a single precompiled, case-insensitive regex, so an entry is matched
+against every alternative in one pass instead of only the first term.
+
+Grammar (as used in the subscriber sheet and the translated queries):
+    expression := alternative ( OR alternative )*
+    alternative := "quoted phrase" | bare words
+Parentheses are grouping only and are ignored.
+"""
+
+import functools
+import re
+from typing import FrozenSet, NamedTuple, Pattern, Tuple
+
+_TOKEN_RE = re.compile(r'"([^"]*)"|(\()|(\))|(\S+?)(?=[\s()"]|$)')
+
+
+class TopicQuery(NamedTuple):
+    """A compiled topic expression (immutable)."""
+    expression: str
+    terms: Tuple[str, ...]  # Alternatives in source order, original case
+    pattern: Pattern  # One regex matching any alternative
+
+    @property
+    def first_term(self) -> str:
+        return self.terms[0] if self.terms else self.expression
+
+    @property
+    def is_boolean(self) -> bool:
+        """True for multi-alternative expressions (legacy sheet topics)."""
+        return len(self.terms) > 1
+
+    def search(self, text: str) -> bool:
+        """
+        Returns: True if any alternative appears in the text
+        """
+        return bool(text) and self.pattern.search(text) is not None
+
+    def hits(self, text: str) -> FrozenSet[str]:
+        """
+        Returns: The distinct alternatives (lowercased) found in the text
+        """
+        if not text:
+            return frozenset()
+        terms = {term.lower() for term in self.terms}
+        found = set()
+        for match in self.pattern.finditer(text):
+            hit = " ".join(match.group(1).lower().split())
+            # Report "silicon anodes" as the alternative "silicon anode"
+            for base in (hit, hit[:-1], hit[:-2]):
+                if base in terms:
+                    hit = base
+                    break
+            found.add(hit)
+        return frozenset(found)
+
+
+def parse_alternatives(expression: str) -> Tuple[str, ...]:
+    """
+    Splits an expression into its OR alternatives.
+
+    Consecutive bare words form one phrase ("Sodium-Ion battery").
+
+    Args:
+        expression: Topic name, Boolean topic or search query
+
+    Returns:
+        tuple: Distinct alternatives in source order
+    """
+    alternatives, words = [], []
+
+    def close():
+        phrase = " ".join(" ".join(words).split())
+        if phrase and phrase.lower() not in (a.lower() for a in alternatives):
+            alternatives.append(phrase)
+        words.clear()
+
+    for quoted, _, _, bare in _TOKEN_RE.findall(expression):
+        if bare == "OR":
+            close()
+        elif quoted or bare:
+            words.append(quoted or bare)
+    close()
+    return tuple(alternatives)
+
+
+def _term_regex(term: str) -> str:
+    # Latin-script terms must start a word ("LFP" must not match inside
+    # "ALFP") but may take a plural ending ("silicon anodes", "LFPs");
+    # CJK text has no spaces, so no edges there
+    body = r"\s+".join(re.escape(word) for word in term.split())
+    head = r"(?<![A-Za-z0-9])" if term[0].isascii() and term[0].isalnum() else ""
+    tail = ""
+    if term[-1].isascii() and term[-1].isalpha():
+        tail = r"(?:e?s)?(?![A-Za-z0-9])"
+    elif term[-1].isdigit():
+        tail = r"(?![0-9])"  # "4680" but not "46800"
+    return head + body + tail
+
+
+@functools.lru_cache(maxsize=None)
+def compile_query(*expressions: str) -> TopicQuery:
+    """
+    Compiles one or more expressions into a single matcher.
+
+    Several expressions (e.g. a topic and its translated search query) are
+    merged as if joined with OR.
+
+    Args:
+        *expressions: Topic names, Boolean topics or search queries
+
+    Returns:
+        TopicQuery: Cached compiled query
+    """
+    terms = []
+    seen = set()
+    for expression in expressions:
+        for term in parse_alternatives(expression):
+            if term.lower() not in seen:
+                seen.add(term.lower())
+                terms.append(term)
+    # Longest first, so the longer of two overlapping alternatives is reported
+    ordered = sorted(terms, key=len, reverse=True)
+    pattern = "|".join(_term_regex(term) for term in ordered) or r"(?!)"
+    return TopicQuery(" OR ".join(expressions), tuple(terms), re.compile(f"({pattern})", re.IGNORECASE))
@@ -7,12 +7,27 @@ import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import hashlib
 import base64
-from typing import List, Optional, Dict, Any
+import re
+import threading
+import time
+from typing import List, Optional, Dict, Any, Callable
+
+from signup_queue import SignupQueue
 
 # --- CONFIGURATION ---
 SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 SHEET_NAME = "Battery Subscribers"
 
+# --- SHEETS CLIENT CACHE ---
+# The authorized client and worksheet handle are shared process-wide (Streamlit
+# reruns the script on every interaction but keeps the module loaded)
+SHEET_HANDLE_MAX_AGE = 45 * 60  # Rebuild before the 1-hour access token expires
+INDEX_TTL_SECONDS = 60  # Subscriber index: how soon rows appended elsewhere are picked up
+
+_sheet_lock = threading.Lock()
+_sheet_cache: Dict[str, Any] = {"sheet": None, "created_at": 0.0}
+_sheet_opener: Optional[Callable[[Dict[str, Any]], Any]] = None  # None -> open_sheet()
+
 # --- TOPIC CATEGORIES ---
 TECH_TOPICS = [
     "Next-Gen Batteries",
@@ -36,7 +51,7 @@ SUPPLY_TOPICS = [
 
 # --- GOOGLE SHEETS FUNCTIONS ---
 
-def get_sheet(secrets: Dict[str, Any]):
+def open_sheet(secrets: Dict[str, Any]):
     """
     Connects to Google Sheets using service account credentials.
 
@@ -55,9 +70,314 @@ def get_sheet(secrets: Dict[str, Any]):
     return client.open(SHEET_NAME).sheet1
 
 
+def get_sheet(secrets: Dict[str, Any]):
+    """
+    Returns the cached worksheet handle, connecting on first use.
+
+    The handle is rebuilt after SHEET_HANDLE_MAX_AGE seconds so a fresh
+    access token is minted before the old one expires.
+
+    Args:
+        secrets: Dictionary containing 'gcp_service_account' credentials
+
+    Returns:
+        gspread.Worksheet: The first worksheet of the Battery Subscribers sheet
+
+    Raises:
+        Exception: If connection to Google Sheets fails
+    """
+    with _sheet_lock:
+        sheet = _sheet_cache["sheet"]
+        if sheet is None or time.monotonic() - _sheet_cache["created_at"] > SHEET_HANDLE_MAX_AGE:
+            sheet = (_sheet_opener or open_sheet)(secrets)
+            _sheet_cache["sheet"] = sheet
+            _sheet_cache["created_at"] = time.monotonic()
+        return sheet
+
+
+def set_sheet_opener(opener: Optional[Callable[[Dict[str, Any]], Any]]):
+    """
+    Replaces how worksheet handles are built (e.g. a fake gspread backend in tests).
+
+    Args:
+        opener: Callable(secrets) returning a worksheet-like object, or None for open_sheet()
+    """
+    global _sheet_opener
+    _sheet_opener = opener
+    reset_sheet_cache()
+
+
+def reset_sheet_cache():
+    """Drops the cached worksheet handle and subscriber index."""
+    with _sheet_lock:
+        _sheet_cache["sheet"] = None
+        _sheet_cache["created_at"] = 0.0
+    subscriber_index.reset()
+
+
+def with_sheet(secrets: Dict[str, Any], action: Callable[[Any], Any]):
+    """
+    Runs an action against the cached worksheet, reconnecting once on auth errors.
+
+    Args:
+        secrets: Dictionary containing credentials
+        action: Callable receiving the worksheet
+
+    Returns:
+        Whatever action returns
+    """
+    try:
+        return action(get_sheet(secrets))
+    except gspread.exceptions.APIError as e:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        if status not in (401, 403):
+            raise
+        # Token expired or revoked: rebuild the client once and retry
+        reset_sheet_cache()
+        return action(get_sheet(secrets))
+
+
+# --- SUBSCRIBER INDEX ---
+
+_APPENDED_ROW_RE = re.compile(r"![A-Z]+(\d+)")
+
+
+def normalize_email(email: str) -> str:
+    """Returns the lookup form of an email address (trimmed, lowercased)."""
+    return (email or "").strip().lower()
+
+
+class SubscriberIndex:
+    """
+    Local email -> sheet row numbers map.
+
+    Built once from column A, then refreshed incrementally: only rows past
+    the last known row are read, and our own appends and deletes are applied
+    locally. Rows are re-checked with one batch read before any write, and
+    the map is rebuilt if the sheet was edited by hand in between.
+    """
+
+    def __init__(self, ttl: float = INDEX_TTL_SECONDS):
+        """
+        Args:
+            ttl: Seconds before new rows appended elsewhere are picked up
+        """
+        self.ttl = ttl
+        self.lock = threading.RLock()
+        self._rows: Dict[str, List[int]] = {}
+        self._last_row = 0  # Highest row number covered (0 = not built)
+        self._refreshed_at = 0.0
+
+    def _add(self, email: str, row: int):
+        key = normalize_email(email)
+        if key:
+            self._rows.setdefault(key, []).append(row)
+
+    def rebuild(self, sheet):
+        """Re-reads the whole email column."""
+        emails = sheet.col_values(1)
+        self._rows = {}
+        # Row 1 is the header
+        for row, email in enumerate(emails[1:], start=2):
+            self._add(email, row)
+        self._last_row = max(len(emails), 1)
+        self._refreshed_at = time.monotonic()
+
+    def refresh(self, sheet, force: bool = False):
+        """Reads rows appended since the last refresh (full build on first use)."""
+        if not self._last_row:
+            self.rebuild(sheet)
+            return
+        if not force and time.monotonic() - self._refreshed_at < self.ttl:
+            return
+        start = self._last_row + 1
+        for offset, values in enumerate(sheet.get(f"A{start}:A")):
+            if values:
+                self._add(values[0], start + offset)
+            self._last_row = start + offset
+        self._refreshed_at = time.monotonic()
+
+    def rows_for(self, sheet, email: str) -> List[int]:
+        """
+        Returns the verified sheet rows holding an email.
+
+        Args:
+            sheet: Worksheet handle
+            email: Subscriber email
+
+        Returns:
+            List[int]: Row numbers, ascending (empty if not subscribed)
+        """
+        return self.rows_for_many(sheet, [email])[normalize_email(email)]
+
+    def rows_for_many(self, sheet, emails: List[str]) -> Dict[str, List[int]]:
+        """
+        Batch form of rows_for(): all candidate rows are checked in one read.
+
+        Args:
+            sheet: Worksheet handle
+            emails: Subscriber emails
+
+        Returns:
+            dict: Normalized email -> row numbers, ascending
+        """
+        self.refresh(sheet)
+        keys = {normalize_email(email) for email in emails}
+        result = {key: list(self._rows.get(key, [])) for key in keys}
+        expected = [(row, key) for key, rows in result.items() for row in rows]
+        if not expected:
+            return result
+        found = sheet.batch_get([f"A{row}" for row, _ in expected])
+        if all(values and values[0] and normalize_email(values[0][0]) == key
+               for values, (_, key) in zip(found, expected)):
+            return result
+        # The sheet changed underneath us: rebuild and trust the fresh map
+        self.rebuild(sheet)
+        return {key: list(self._rows.get(key, [])) for key in keys}
+
+    def note_append(self, emails: List[str], response: Optional[Dict[str, Any]]):
+        """Records rows added by append_row(s)(), using the range in the response."""
+        updated = ((response or {}).get("updates") or {}).get("updatedRange", "")
+        match = _APPENDED_ROW_RE.search(updated)
+        if match and int(match.group(1)) == self._last_row + 1:
+            for email in emails:
+                self._last_row += 1
+                self._add(email, self._last_row)
+        else:
+            self._refreshed_at = 0.0  # Pick it up on the next incremental refresh
+
+    def note_delete(self, deleted: List[int]):
+        """Shifts row numbers after rows were deleted."""
+        deleted = sorted(deleted)
+        gone = set(deleted)
+
+        def shifted(row: int) -> int:
+            return row - sum(1 for d in deleted if d < row)
+
+        remaining = {}
+        for email, rows in self._rows.items():
+            kept = [shifted(row) for row in rows if row not in gone]
+            if kept:
+                remaining[email] = kept
+        self._rows = remaining
+        self._last_row -= len(gone)
+
+    def reset(self):
+        """Forgets the map; the next lookup rebuilds it."""
+        self._rows = {}
+        self._last_row = 0
+
+
+subscriber_index = SubscriberIndex()
+
+
+def delete_sheet_rows(sheet, rows: List[int]):
+    """
+    Deletes several rows in a single batch_update request.
+
+    Rows are deleted bottom-up so earlier deletions do not shift later ones.
+
+    Args:
+        sheet: Worksheet handle
+        rows: 1-based row numbers
+    """
+    requests = [
+        {"deleteDimension": {"range": {"sheetId": sheet.id, "dimension": "ROWS",
+                                       "startIndex": row - 1, "endIndex": row}}}
+        for row in sorted(set(rows), reverse=True)
+    ]
+    if requests:
+        sheet.spreadsheet.batch_update({"requests": requests})
+
+
+def write_subscribers(sheet, rows: List[List[str]]):
+    """
+    Upserts a batch of [email, topics, frequency] rows with at most three requests.
+
+    Existing subscribers have their first row overwritten (one batch_update),
+    new ones are added with one append_rows, and older duplicate rows are
+    removed with one batch delete.
+
+    Args:
+        sheet: Worksheet handle
+        rows: Rows to write (one per email)
+    """
+    with subscriber_index.lock:
+        known = subscriber_index.rows_for_many(sheet, [row_values[0] for row_values in rows])
+        updates, appends, duplicates = [], [], []
+        for row_values in rows:
+            existing = known[normalize_email(row_values[0])]
+            if existing:
+                updates.append({"range": f"A{existing[0]}:C{existing[0]}", "values": [row_values]})
+                duplicates.extend(existing[1:])
+            else:
+                appends.append(row_values)
+
+        if updates:
+            sheet.batch_update(updates)
+        if appends:
+            response = sheet.append_rows(appends)
+            subscriber_index.note_append([row_values[0] for row_values in appends], response)
+        if duplicates:
+            delete_sheet_rows(sheet, duplicates)
+            subscriber_index.note_delete(duplicates)
+
+
+# --- SIGNUP QUEUE ---
+# Form submits are acknowledged once queued locally; a background thread
+# writes them to the sheet in batches (see signup_queue.py)
+
+_signup_queue: Optional[SignupQueue] = None
+_signup_queue_lock = threading.Lock()
+
+
+def get_signup_queue(secrets: Dict[str, Any]) -> SignupQueue:
+    """
+    Returns the process-wide signup queue, starting its flusher on first use.
+
+    Args:
+        secrets: Dictionary containing credentials (used by the flusher)
+
+    Returns:
+        SignupQueue: The shared queue
+    """
+    global _signup_queue
+    with _signup_queue_lock:
+        if _signup_queue is None:
+            _signup_queue = SignupQueue()
+            _signup_queue.start(lambda rows: flush_signups(rows, secrets), write_lock=subscriber_index.lock)
+        return _signup_queue
+
+
+def flush_signups(rows: List[List[str]], secrets: Dict[str, Any]):
+    """
+    Writes a batch of queued signups to the sheet.
+
+    Args:
+        rows: [email, topics, frequency] rows
+        secrets: Dictionary containing credentials
+    """
+    with_sheet(secrets, lambda sheet: write_subscribers(sheet, rows))
+    print(f"📝 Wrote {len(rows)} signup(s) to the sheet")
+
+
+def _delete_subscriber(sheet, email: str) -> int:
+    with subscriber_index.lock:
+        rows = subscriber_index.rows_for(sheet, email)
+        if rows:
+            delete_sheet_rows(sheet, rows)
+            subscriber_index.note_delete(rows)
+        return len(rows)
+
+
 def save_subscriber(email: str, topics: List[str], frequency: str, secrets: Dict[str, Any]) -> tuple[bool, Optional[str]]:
     """
-    Saves a new subscriber to the Google Sheet.
+    Saves a subscriber to the Google Sheet.
+
+    The signup is committed to the local signup queue and acknowledged at
+    once; the background flusher writes it to the sheet. An email that is
+    already subscribed has its existing row updated (and any duplicate rows
+    removed) instead of getting a new row.
 
     Args:
         email: Subscriber's email address
@@ -67,15 +387,14 @@ def save_subscriber(email: str, topics: List[str], frequency: str, secrets: Dict
 
     Returns:
         tuple: (success: bool, error_message: Optional[str])
-            - (True, None) if save was successful
+            - (True, None) if the signup was recorded
             - (False, error_message) if save failed
     """
     try:
-        sheet = get_sheet(secrets)
         # Convert list ['Lithium', 'Cobalt'] -> string 'Lithium|Cobalt'
         topic_string = "|".join(topics)
         # Sheet structure: Email | Topics | Frequency
-        sheet.append_row([email, topic_string, frequency])
+        get_signup_queue(secrets).enqueue(email, topic_string, frequency)
         return True, None
     except Exception as e:
         return False, f"Error saving to database: {e}"
@@ -107,7 +426,7 @@ def verify_unsubscribe_token(token_string: str, secrets: Dict[str, Any]) -> Opti
 
 def remove_subscriber(email: str, secrets: Dict[str, Any]) -> tuple[bool, Optional[str]]:
     """
-    Removes a subscriber from the Google Sheet.
+    Removes every row of a subscriber from the Google Sheet.
 
     Args:
         email: Email address to remove
@@ -119,10 +438,12 @@ def remove_subscriber(email: str, secrets: Dict[str, Any]) -> tuple[bool, Option
             - (False, error_message) if removal failed or email not found
     """
     try:
-        sheet = get_sheet(secrets)
-        cell = sheet.find(email)
-        if cell:
-            sheet.delete_rows(cell.row)
+        # A signup still waiting in the queue must not be written back later;
+        # the flusher holds the same lock from reading a batch to writing it
+        with subscriber_index.lock:
+            discarded = get_signup_queue(secrets).discard(email)
+            removed = with_sheet(secrets, lambda sheet: _delete_subscriber(sheet, email))
+        if removed or discarded:
             return True, None
         else:
             return False, "Email not found in subscriber list"